@@ -1,6 +1,9 @@
 import argparse
 from tabulate import tabulate
 
+# Smallest prefill chunk a configuration must fit when no chunk size is given
+MIN_PREFILL_CHUNK = 512
+
 def main():
     parser = argparse.ArgumentParser(description='GPU Performance Calculator for LLMs')
     parser.add_argument('-g', '--num_gpu', type=int, default=1, help='Number of GPUs')
@@ -9,6 +12,11 @@ def main():
     parser.add_argument('-c', '--n_concurrent_req', type=int, default=10, help='Number of concurrent requests')
     parser.add_argument('--precision', type=str, default='fp16', choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'], 
                        help='Precision level to use for calculations')
+    parser.add_argument('-b', '--max_batched_tokens', type=int, default=None,
+                        help='Maximum tokens per prefill batch (largest that fits in memory if not specified)')
+    parser.add_argument('--attention', type=str, default='flash', choices=['flash', 'naive'],
+                        help='Attention implementation; naive attention materializes the attention scores')
+    parser.add_argument('--workspace_gb', type=float, default=1.0, help='Framework workspace memory per GPU (GB)')
 
     args = parser.parse_args()
 
@@ -17,9 +25,13 @@ def main():
     response_size = args.response_sz
     n_concurrent_request = args.n_concurrent_req
     precision = args.precision
+    max_batched_tokens = args.max_batched_tokens
+    attention = args.attention
+    workspace_gb = args.workspace_gb
 
     print(f" num_gpu = {num_gpu}, prompt_size = {prompt_size} tokens, response_size = {response_size} tokens")
     print(f" n_concurrent_request = {n_concurrent_request}, precision = {precision}")
+    print(f" attention = {attention}, workspace = {workspace_gb} GB per GPU, max_batched_tokens = {max_batched_tokens or 'auto'}")
 
     gpu_specs = [
         # {"name":"A10","memory_gb":24,"memory_bandwidth_gbps":600,"connectivity":"PCIe","int8_tops":250,"fp8_tflops":None,"fp16_tflops":125,"bf16_tflops":125,"tf32_tflops":62.5,"fp32_tflops":31.2,"fp64_tflops":1.2},
@@ -143,6 +155,46 @@ def main():
             return "N/A"
         return (prompt_size * prefill_time_per_token + response_size * tpot) / 1000
 
+    def calc_prefill_activation_memory(n_tokens, d_model, n_heads, num_gpu, bytes_per_parameter, attention, ffn_mult=3.5, seq_len=None):
+        # Activations stay in 16-bit even when the weights are stored in 8 bits
+        activation_bytes = max(bytes_per_parameter, 2)
+        # Hidden states and their normalized copy are replicated on every GPU
+        hidden = 2 * n_tokens * d_model
+        # Q, K, V and the attention output are split across GPUs by tensor parallelism
+        attention_activations = 4 * n_tokens * d_model / num_gpu
+        if attention == 'naive':
+            # Attention scores and softmax probabilities for every head; a chunk of a
+            # longer prompt attends to the whole prefix, a batch of prompts to each prompt
+            seq_len = n_tokens if seq_len is None else seq_len
+            attention_activations += 2 * (n_heads / num_gpu) * n_tokens * seq_len
+        # Gate, up and activated MLP intermediates
+        mlp_activations = 3 * n_tokens * ffn_mult * d_model / num_gpu
+        # Layers run one at a time, so only the larger block of one layer is live (GB per GPU)
+        return (hidden + max(attention_activations, mlp_activations)) * activation_bytes / BYTES_IN_GB
+
+    def calc_max_batched_tokens(free_memory_gb, d_model, n_heads, num_gpu, bytes_per_parameter, attention, limit, seq_len=None):
+        low, high = 0, limit
+        while low < high:
+            mid = (low + high + 1) // 2
+            if calc_prefill_activation_memory(mid, d_model, n_heads, num_gpu, bytes_per_parameter, attention, seq_len=seq_len) <= free_memory_gb:
+                low = mid
+            else:
+                high = mid - 1
+        return low
+
+    def calc_chunked_prefill_time(prompt_size, max_batched_tokens, prefill_time_per_token, tpot):
+        if isinstance(prefill_time_per_token, str) or isinstance(tpot, str) or max_batched_tokens <= 0:
+            return "N/A"
+        full_chunks, remainder = divmod(prompt_size, max_batched_tokens)
+        # Every chunk reads all weights once, so it is never faster than a decode step
+        prefill_time = full_chunks * max(max_batched_tokens * prefill_time_per_token, tpot)
+        if remainder:
+            prefill_time += max(remainder * prefill_time_per_token, tpot)
+        return prefill_time
+
+    # Every configuration must fit the activations of at least this prefill chunk
+    required_chunk = max_batched_tokens if max_batched_tokens is not None else min(prompt_size, MIN_PREFILL_CHUNK)
+
     # Get bytes per parameter for the specified precision
     bytes_per_parameter = get_bytes_per_parameter(precision)
     print(f"Using {bytes_per_parameter} bytes per parameter for {precision} precision")
@@ -152,9 +204,11 @@ def main():
     for model_spec in model_specs:
         kv_cache_size_per_token = calc_kv_cache_size_per_token(model_spec["n_layers"], model_spec["d_model"], bytes_per_parameter)
         context_window = prompt_size + response_size
+        activation_memory = calc_prefill_activation_memory(required_chunk, model_spec["d_model"], model_spec["n_heads"], num_gpu, bytes_per_parameter, attention, seq_len=prompt_size)
         memory_footprint = calc_memory_footprint(model_spec, n_concurrent_request, context_window, bytes_per_parameter)
-        memory_footprint_table.append([model_spec['name'], f"{kv_cache_size_per_token:.6f} GiB/token", f"{memory_footprint:.2f} GB"])
-    print(tabulate(memory_footprint_table, headers=['Model', 'KV Cache Size per Token', 'Memory Footprint'], tablefmt='orgtbl'))
+        memory_footprint += num_gpu * (activation_memory + workspace_gb)
+        memory_footprint_table.append([model_spec['name'], f"{kv_cache_size_per_token:.6f} GiB/token", f"{activation_memory:.2f} GB", f"{memory_footprint:.2f} GB"])
+    print(tabulate(memory_footprint_table, headers=['Model', 'KV Cache Size per Token', f'Prefill Activation per GPU ({required_chunk} tokens)', 'Memory Footprint'], tablefmt='orgtbl'))
 
     # Check if any GPU+model combinations would be OOM with current settings
     print(f"\n******************** OOM Warnings ********************")
@@ -164,13 +218,15 @@ def main():
             kv_cache_size_per_token = calc_kv_cache_size_per_token(model["n_layers"], model["d_model"], bytes_per_parameter)
             context_window = prompt_size + response_size
             memory_footprint = calc_memory_footprint(model, n_concurrent_request, context_window, bytes_per_parameter)
+            # Prefill activations and workspace are reserved on every GPU
+            reserved_memory = workspace_gb + calc_prefill_activation_memory(required_chunk, model["d_model"], model["n_heads"], num_gpu, bytes_per_parameter, attention, seq_len=prompt_size)
 
-            available_memory = num_gpu * gpu["memory_gb"]
+            available_memory = num_gpu * (gpu["memory_gb"] - reserved_memory)
             if memory_footprint > available_memory:
                 oom_warnings = True
                 print(f"\n!!!! Warning {model['name']}: n_concurrent_request={n_concurrent_request} is TOO Large!!!")
                 print(f"Causing OOM with prompt={prompt_size} and response={response_size} using {num_gpu}x {gpu['name']}")
-                kv_cache_tokens = calc_kv_cache_tokens(num_gpu, gpu["memory_gb"], model["params_billion"], kv_cache_size_per_token, bytes_per_parameter)
+                kv_cache_tokens = calc_kv_cache_tokens(num_gpu, gpu["memory_gb"] - reserved_memory, model["params_billion"], kv_cache_size_per_token, bytes_per_parameter)
                 max_n_concurrent_req = int(kv_cache_tokens // context_window)
                 print(f"Max number of concurrent requests for this configuration: {max_n_concurrent_req}")
     
@@ -193,10 +249,20 @@ def main():
         for model in model_specs:
             kv_cache_size = calc_kv_cache_size_per_token(model['n_layers'], model['d_model'], bytes_per_parameter)
             context_window = prompt_size + response_size
+            reserved_memory = workspace_gb + calc_prefill_activation_memory(required_chunk, model['d_model'], model['n_heads'], num_gpu, bytes_per_parameter, attention, seq_len=prompt_size)
             
             for gpu in supported_gpus:
                 gpu_perf = get_compute_perf_for_precision(gpu, precision)
-                kv_cache_tokens = calc_kv_cache_tokens(num_gpu, gpu['memory_gb'], model['params_billion'], kv_cache_size, bytes_per_parameter)
+                kv_cache_tokens = calc_kv_cache_tokens(num_gpu, gpu['memory_gb'] - reserved_memory, model['params_billion'], kv_cache_size, bytes_per_parameter)
+
+                # Largest prefill batch that fits next to the weights and the KV cache of all requests
+                memory_footprint = calc_memory_footprint(model, n_concurrent_request, context_window, bytes_per_parameter)
+                free_memory = gpu['memory_gb'] - memory_footprint / num_gpu - workspace_gb
+                batched_tokens = calc_max_batched_tokens(
+                    free_memory, model['d_model'], model['n_heads'], num_gpu, bytes_per_parameter, attention,
+                    max_batched_tokens if max_batched_tokens is not None else prompt_size * n_concurrent_request,
+                    seq_len=prompt_size
+                )
                 
                 if gpu_perf is None:
                     prefill_time_per_token = "Not Supported"
@@ -213,8 +279,14 @@ def main():
                     e2e_latency = "N/A"
                     throughput = "N/A"
                 else:
-                    ttft = f"{(prefill_time_per_token + tpot / 1000):.3f} s"
-                    e2e_latency_val = calc_e2e_latency(prefill_time_per_token, tpot, prompt_size, response_size)
+                    # Prompts longer than the prefill batch are processed in chunks
+                    prefill_total = calc_chunked_prefill_time(prompt_size, batched_tokens, prefill_time_per_token, tpot)
+                    if isinstance(prefill_total, str):
+                        ttft = prefill_total
+                        e2e_latency_val = prefill_total
+                    else:
+                        ttft = f"{(prefill_total + tpot) / 1000:.3f} s"
+                        e2e_latency_val = (prefill_total + response_size * tpot) / 1000
                     
                     if isinstance(e2e_latency_val, str):
                         e2e_latency = e2e_latency_val
@@ -239,13 +311,14 @@ def main():
                 
                 capacity_latency_table.append([
                     model['name'], gpu['name'], memory_status, f"{int(kv_cache_tokens)}", 
-                    prefill_time_formatted, tpot_formatted, ttft, e2e_latency, throughput
+                    prefill_time_formatted, tpot_formatted, ttft, e2e_latency, throughput,
+                    batched_tokens if batched_tokens > 0 else "OOM"
                 ])
                 
         print(tabulate(capacity_latency_table, 
                       headers=['Model', 'GPU', 'Memory Status', 'Max KV Cache Tokens', 
                               f'Prefill ({precision})', 'TPOT (ms)', 'TTFT', 
-                              'E2E Latency', 'Throughput'], 
+                              'E2E Latency', 'Throughput', 'Max Batched Tokens'], 
                       tablefmt='orgtbl'))
 
 if __name__ == '__main__':
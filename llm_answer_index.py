@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import time
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+    calc_e2e_latency,
+)
+
+PRECISIONS = ['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64']
+GPU_COUNTS = [1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 24, 32]
+PROMPT_BUCKETS = [256, 512, 1024, 2048, 4096, 8192, 16384, 32768, 65536, 131072]
+RESPONSE_BUCKETS = [64, 128, 256, 512, 1024, 2048, 4096]
+
+# Column name -> dtype of the stored table
+COLUMNS = {
+    'gpu': np.int16,
+    'num_gpu': np.int16,
+    'max_concurrent': np.int32,
+    'ttft': np.float32,
+    'e2e_latency': np.float32,
+    'throughput': np.float32,
+    'monthly_opex': np.float32,
+    'total_capex': np.float32,
+}
+# Rows are sorted by throughput within each group; these get a separate sorted index
+INDEXED_COLUMNS = ['e2e_latency', 'monthly_opex']
+
+def main():
+    parser = argparse.ArgumentParser(description='Precomputed Answer Index for LLM GPU Configuration Queries')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Precompute the configuration table into an index directory')
+    build_parser.add_argument('-o', '--index_dir', type=str, default='answer_index', help='Index directory to write')
+
+    query_parser = subparsers.add_parser('query', help='Answer a threshold query from an index directory')
+    query_parser.add_argument('-i', '--index_dir', type=str, default='answer_index', help='Index directory to read')
+    query_parser.add_argument('-m', '--model', type=str, required=True, help='Model name')
+    query_parser.add_argument('-t', '--token_rate', type=float, required=True, help='Minimum token rate (tokens/sec)')
+    query_parser.add_argument('-l', '--max_latency', type=float, required=True, help='Maximum acceptable E2E latency (seconds)')
+    query_parser.add_argument('-p', '--prompt_sz', type=int, default=4096, help='Prompt size in tokens')
+    query_parser.add_argument('-r', '--response_sz', type=int, default=256, help='Response size in tokens')
+    query_parser.add_argument('-w', '--precision', type=str, default='fp16', choices=PRECISIONS,
+                              help='Precision level to use for calculations')
+    query_parser.add_argument('-n', '--top', type=int, default=10, help='Number of configurations to show')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        n_rows = build_index(args.index_dir)
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {n_rows:,} configurations to {args.index_dir} in {elapsed:.2f} s")
+        return
+
+    index = AnswerIndex(args.index_dir)
+    try:
+        start = time.perf_counter()
+        rows = index.query(args.model, args.token_rate, args.max_latency, args.prompt_sz, args.response_sz,
+                           args.precision, args.top)
+        elapsed = time.perf_counter() - start
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    prompt_bucket, response_bucket = index.bucket_for(args.prompt_sz, args.response_sz)
+    print(f"\n*** Configurations for {args.model} ***")
+    print(f"Token rate >= {args.token_rate} tokens/sec, E2E latency <= {args.max_latency} seconds")
+    print(f"Workload bucket: prompt {prompt_bucket} tokens, response {response_bucket} tokens, precision {args.precision}")
+    print(f"Answered in {elapsed * 1e6:.0f} us")
+
+    if not rows:
+        print("\nNo configurations meet the constraints.")
+        return
+
+    print(tabulate([[
+        row['gpu'],
+        row['num_gpu'],
+        row['max_concurrent'],
+        f"{row['ttft']:.3f} s",
+        f"{row['e2e_latency']:.3f} s",
+        f"{row['throughput']:.2f} tokens/s",
+        f"${row['monthly_opex']:,.2f}",
+        f"${row['total_capex']:,.2f}",
+    ] for row in rows], headers=[
+        'GPU Model',
+        'GPUs',
+        'Max Concurrent',
+        'TTFT',
+        'E2E Latency',
+        'Throughput',
+        'Monthly Opex',
+        'Total Capex',
+    ], tablefmt='orgtbl'))
+
+def build_index(index_dir):
+    """Precompute every model x GPU x count x precision x workload bucket configuration.
+
+    The table is stored column by column as .npy files. Rows are grouped by
+    (model, precision, prompt bucket, response bucket) and sorted by throughput
+    within each group; e2e latency and monthly opex get a sorted index per group.
+    Returns the number of rows written.
+    """
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    # One axis per dimension: model, precision, prompt, response, gpu, count
+    params_billion = np.array([m["params_billion"] for m in model_specs], dtype=float)[:, None, None, None, None, None]
+    max_context = np.array([m["max_context_window"] for m in model_specs], dtype=float)[:, None, None, None, None, None]
+    bytes_per_parameter = np.array([get_bytes_per_parameter(p) for p in PRECISIONS], dtype=float)[None, :, None, None, None, None]
+    kv_cache_size_per_token = calc_kv_cache_size_per_token(
+        np.array([m["n_layers"] for m in model_specs], dtype=float)[:, None, None, None, None, None],
+        np.array([m["d_model"] for m in model_specs], dtype=float)[:, None, None, None, None, None],
+        bytes_per_parameter,
+    )
+    prompt_sz = np.array(PROMPT_BUCKETS, dtype=float)[None, None, :, None, None, None]
+    response_sz = np.array(RESPONSE_BUCKETS, dtype=float)[None, None, None, :, None, None]
+    gpu_perf = np.array([[get_compute_perf_for_precision(g, p) or np.nan for g in gpu_specs] for p in PRECISIONS],
+                        dtype=float)[None, :, None, None, :, None]
+    memory_gb = np.array([g["memory_gb"] for g in gpu_specs], dtype=float)[None, None, None, None, :, None]
+    bandwidth = np.array([g["memory_bandwidth_gbps"] for g in gpu_specs], dtype=float)[None, None, None, None, :, None]
+    opex_per_day = np.array([g["opex_per_day"] for g in gpu_specs], dtype=float)[None, None, None, None, :, None]
+    capex = np.array([g["capex"] for g in gpu_specs], dtype=float)[None, None, None, None, :, None]
+    num_gpu = np.array(GPU_COUNTS, dtype=float)[None, None, None, None, None, :]
+
+    # Weights and KV cache formulas of the calculators, without the prefill activation
+    # and workspace reserve, for every configuration at once
+    context_window = prompt_sz + response_sz
+    kv_cache_tokens = (num_gpu * memory_gb - params_billion * bytes_per_parameter) / kv_cache_size_per_token
+    max_concurrent = np.floor(np.maximum(kv_cache_tokens, 0) / context_window)
+    prefill_time = calc_prefill_time_per_token(num_gpu, params_billion, gpu_perf)
+    tpot = calc_tpot(num_gpu, params_billion, bandwidth)
+    ttft = (prompt_sz * prefill_time + tpot) / 1000
+    e2e_latency = calc_e2e_latency(prefill_time, tpot, prompt_sz, response_sz)
+    throughput = response_sz / e2e_latency * max_concurrent
+
+    shape = np.broadcast_shapes(max_concurrent.shape, throughput.shape)
+    full = {
+        'gpu': np.arange(len(gpu_specs))[None, None, None, None, :, None],
+        'num_gpu': num_gpu,
+        'max_concurrent': max_concurrent,
+        'ttft': ttft,
+        'e2e_latency': e2e_latency,
+        'throughput': throughput,
+        'monthly_opex': num_gpu * opex_per_day * 30,
+        'total_capex': num_gpu * capex,
+    }
+    full = {name: np.broadcast_to(values, shape).reshape(-1) for name, values in full.items()}
+    # Configurations that cannot serve even one request are left out
+    viable = np.broadcast_to((max_concurrent >= 1) & ~np.isnan(gpu_perf) & (context_window <= max_context), shape).reshape(-1)
+
+    n_groups = len(model_specs) * len(PRECISIONS) * len(PROMPT_BUCKETS) * len(RESPONSE_BUCKETS)
+    rows_per_group = len(gpu_specs) * len(GPU_COUNTS)
+    group = np.repeat(np.arange(n_groups), rows_per_group)[viable]
+    table = {name: values[viable] for name, values in full.items()}
+
+    # Group-major, throughput ascending within each group
+    order = np.lexsort((table['throughput'], group))
+    group = group[order]
+    table = {name: values[order].astype(COLUMNS[name]) for name, values in table.items()}
+    offsets = np.searchsorted(group, np.arange(n_groups + 1)).astype(np.int64)
+
+    os.makedirs(index_dir, exist_ok=True)
+    for name, values in table.items():
+        np.save(os.path.join(index_dir, f"{name}.npy"), values)
+    np.save(os.path.join(index_dir, 'offsets.npy'), offsets)
+
+    for name in INDEXED_COLUMNS:
+        # Sort by (group, value) so each group's slice of the index is ordered by value
+        index = np.lexsort((table[name], group)).astype(np.int64)
+        np.save(os.path.join(index_dir, f"idx_{name}.npy"), index)
+        np.save(os.path.join(index_dir, f"key_{name}.npy"), table[name][index])
+
+    meta = {
+        'models': [m["name"] for m in model_specs],
+        'gpus': [g["name"] for g in gpu_specs],
+        'precisions': PRECISIONS,
+        'prompt_buckets': PROMPT_BUCKETS,
+        'response_buckets': RESPONSE_BUCKETS,
+        'gpu_counts': GPU_COUNTS,
+        'rows': int(len(group)),
+    }
+    with open(os.path.join(index_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return len(group)
+
+class AnswerIndex:
+    """Read-only view of a built answer index.
+
+    Every array is memory-mapped, so worker processes opening the same index
+    share the page cache instead of holding their own copies.
+    """
+
+    def __init__(self, index_dir):
+        with open(os.path.join(index_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.columns = {name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r') for name in COLUMNS}
+        self.offsets = np.load(os.path.join(index_dir, 'offsets.npy'), mmap_mode='r')
+        self.indexes = {name: np.load(os.path.join(index_dir, f"idx_{name}.npy"), mmap_mode='r')
+                        for name in INDEXED_COLUMNS}
+        self.keys = {name: np.load(os.path.join(index_dir, f"key_{name}.npy"), mmap_mode='r')
+                     for name in INDEXED_COLUMNS}
+        self.model_lookup = {name.lower(): i for i, name in enumerate(self.meta['models'])}
+
+    def bucket_for(self, prompt_size, response_size):
+        """Round a workload up to the smallest precomputed bucket that covers it."""
+        prompt_buckets = self.meta['prompt_buckets']
+        response_buckets = self.meta['response_buckets']
+        if prompt_size > prompt_buckets[-1] or response_size > response_buckets[-1]:
+            raise ValueError(f"Workload exceeds the largest bucket "
+                             f"({prompt_buckets[-1]} prompt, {response_buckets[-1]} response tokens)")
+        return (prompt_buckets[int(np.searchsorted(prompt_buckets, prompt_size))],
+                response_buckets[int(np.searchsorted(response_buckets, response_size))])
+
+    def group_slice(self, model_name, precision, prompt_size, response_size):
+        """Find the row range of a (model, precision, workload bucket) group."""
+        model = self.model_lookup.get(model_name.lower())
+        if model is None:
+            raise ValueError(f"Model '{model_name}' not found in index")
+        prompt_bucket, response_bucket = self.bucket_for(prompt_size, response_size)
+        group = np.ravel_multi_index(
+            (model, self.meta['precisions'].index(precision),
+             self.meta['prompt_buckets'].index(prompt_bucket), self.meta['response_buckets'].index(response_bucket)),
+            (len(self.meta['models']), len(self.meta['precisions']),
+             len(self.meta['prompt_buckets']), len(self.meta['response_buckets'])),
+        )
+        return int(self.offsets[group]), int(self.offsets[group + 1])
+
+    def query(self, model_name, min_token_rate, max_latency, prompt_size, response_size, precision, top):
+        """Return the cheapest configurations meeting the token rate and latency thresholds."""
+        start, end = self.group_slice(model_name, precision, prompt_size, response_size)
+
+        # Rows are sorted by throughput within the group
+        first = start + int(np.searchsorted(self.columns['throughput'][start:end], min_token_rate, side='left'))
+        # The e2e latency index lists the group's rows by latency
+        n_fast = int(np.searchsorted(self.keys['e2e_latency'][start:end], max_latency, side='right'))
+        fast_rows = np.asarray(self.indexes['e2e_latency'][start:start + n_fast])
+        candidates = np.zeros(end - start, dtype=bool)
+        candidates[fast_rows[fast_rows >= first] - start] = True
+
+        # Walk the group in monthly opex order and keep the candidates
+        by_opex = np.asarray(self.indexes['monthly_opex'][start:end])
+        selected = by_opex[candidates[by_opex - start]][:top]
+
+        gpu_names = self.meta['gpus']
+        return [{
+            name: (gpu_names[int(self.columns[name][row])] if name == 'gpu' else self.columns[name][row].item())
+            for name in COLUMNS
+        } for row in selected]
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+import argparse
+import csv
+import math
+import time
+from datetime import datetime
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+    calc_prefill_activation_memory,
+    calc_max_batched_tokens,
+    calc_chunked_prefill_time,
+    MIN_PREFILL_CHUNK,
+)
+
+# Tensor parallelism normally stays within one node when searching for the replica size
+GPUS_PER_NODE = 8
+# Practical limit used by the GPU requirements calculator
+MAX_GPUS_PER_REPLICA = 128
+
+def main():
+    parser = argparse.ArgumentParser(description='Diurnal Load Autoscaling Cost Simulator for LLMs')
+    parser.add_argument('-m', '--model', type=str, required=True, help='Model name')
+    parser.add_argument('--gpu', type=str, required=True, help='GPU model of each replica')
+    parser.add_argument('-f', '--load', type=str, required=True,
+                        help='CSV/TSV file with a token_rate column (tokens/sec), one row per interval')
+    parser.add_argument('-l', '--max_latency', type=float, required=True, help='Maximum acceptable E2E latency (seconds)')
+    parser.add_argument('-p', '--prompt_sz', type=int, default=4096, help='Prompt size in tokens')
+    parser.add_argument('-r', '--response_sz', type=int, default=256, help='Response size in tokens')
+    parser.add_argument('-w', '--precision', type=str, default='fp16',
+                        choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'],
+                        help='Precision level to use for calculations')
+    parser.add_argument('-g', '--gpus_per_replica', type=int, default=None,
+                        help='GPUs per replica (highest capacity per GPU up to one node if not specified)')
+    parser.add_argument('--interval_s', type=float, default=None,
+                        help='Seconds covered by each row of the load file (from the timestamp column, else 60)')
+    parser.add_argument('--min_replicas', type=int, default=1, help='Minimum number of replicas')
+    parser.add_argument('--scale_up_delay', type=float, default=5,
+                        help='Minutes from requesting a replica until it serves traffic')
+    parser.add_argument('--cooldown', type=float, default=15,
+                        help='Minutes the demand must stay lower before scaling down')
+    parser.add_argument('--target_utilization', type=float, default=0.8,
+                        help='Fraction of replica capacity the autoscaler provisions for')
+    parser.add_argument('--attention', type=str, default='flash', choices=['flash', 'naive'],
+                        help='Attention implementation; naive attention materializes the attention scores')
+    parser.add_argument('--workspace_gb', type=float, default=1.0,
+                        help='Framework workspace memory per GPU (GB)')
+
+    args = parser.parse_args()
+
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    # Find the specified model and GPU in our database
+    model_spec = next((m for m in model_specs if m["name"].lower() == args.model.lower()), None)
+    if model_spec is None:
+        print(f"Error: Model '{args.model}' not found in database.")
+        print("Available models:")
+        for model in model_specs:
+            print(f"- {model['name']}")
+        return
+
+    gpu = next((g for g in gpu_specs if g["name"].lower() == args.gpu.lower()), None)
+    if gpu is None:
+        print(f"Error: GPU '{args.gpu}' not found in database.")
+        print("Available GPUs:")
+        for g in gpu_specs:
+            print(f"- {g['name']}")
+        return
+
+    replica = calc_replica_capacity(model_spec, gpu, args.precision, args.prompt_sz, args.response_sz,
+                                    args.max_latency, args.gpus_per_replica, args.attention, args.workspace_gb)
+    if isinstance(replica, str):
+        print(f"Error: {replica}")
+        return
+
+    token_rate, file_interval_s = load_token_rate(args.load)
+    interval_mismatch = args.interval_s is not None and file_interval_s is not None and \
+        not math.isclose(args.interval_s, file_interval_s)
+    if args.interval_s is None:
+        args.interval_s = file_interval_s if file_interval_s is not None else 60
+    steps_per_minute = 60 / args.interval_s
+    days = len(token_rate) * args.interval_s / 86400
+
+    print(f"\n*** Autoscaling Simulation for {model_spec['name']} on {gpu['name']} ***")
+    print(f"Load: {args.load}, {len(token_rate)} intervals of {args.interval_s:g} s ({days:.2f} days)")
+    print(f"Token rate: mean {token_rate.mean():.1f}, peak {token_rate.max():.1f} tokens/sec")
+    print(f"Replica: {replica['num_gpu']}x {gpu['name']}, {replica['max_concurrent']} concurrent requests, "
+          f"E2E latency {replica['e2e_latency']:.2f} s, capacity {replica['capacity']:.1f} tokens/sec")
+    print(f"Policy: min {args.min_replicas} replicas, scale-up delay {args.scale_up_delay:g} min, "
+          f"cooldown {args.cooldown:g} min, target utilization {args.target_utilization:.0%}")
+    if interval_mismatch:
+        print(f"!!!! Warning: --interval_s {args.interval_s:g} differs from the {file_interval_s:g} s "
+              f"between timestamps in {args.load}")
+    if replica['e2e_latency'] > args.max_latency:
+        print(f"!!!! Warning: a replica does not meet the {args.max_latency} s latency target on its own")
+
+    # The scale-up delay is modelled to a fraction of an interval; the cooldown
+    # only acts on whole intervals
+    cooldown_steps = max(int(round(args.cooldown * steps_per_minute)), 1)
+    if args.cooldown * steps_per_minute < 1:
+        print(f"!!!! Warning: cooldown of {args.cooldown:g} min is shorter than one {args.interval_s:g} s interval; "
+              f"replicas are released at the next interval")
+    elif cooldown_steps != args.cooldown * steps_per_minute:
+        print(f"!!!! Warning: cooldown rounded to {cooldown_steps / steps_per_minute:g} min "
+              f"({cooldown_steps} intervals of {args.interval_s:g} s)")
+
+    start = time.perf_counter()
+    autoscaled = simulate_autoscaling(
+        token_rate, replica['capacity'], args.min_replicas,
+        max(args.scale_up_delay * steps_per_minute, 0),
+        cooldown_steps,
+        args.target_utilization,
+    )
+    # Static provisioning keeps the same headroom as the autoscaler at the peak
+    peak_replicas = max(math.ceil(token_rate.max() / (replica['capacity'] * args.target_utilization)),
+                        args.min_replicas)
+    static = simulate_autoscaling(token_rate, replica['capacity'], peak_replicas, 0, 1, args.target_utilization)
+    elapsed = time.perf_counter() - start
+
+    results = []
+    for policy, outcome in [('Static peak', static), ('Autoscaled', autoscaled)]:
+        gpu_hours = outcome['billed_replicas'].sum() * replica['num_gpu'] * args.interval_s / 3600
+        cost = gpu_hours * gpu['opex_per_day'] / 24
+        violation_minutes = outcome['sla_violation'].sum() / steps_per_minute
+        results.append([
+            policy,
+            f"{outcome['billed_replicas'].min()} / {outcome['billed_replicas'].mean():.1f} / {outcome['billed_replicas'].max()}",
+            f"{gpu_hours:,.0f}",
+            cost,
+            f"{violation_minutes:,.0f} min",
+        ])
+
+    static_cost = results[0][3]
+    for row in results:
+        savings = static_cost - row[3]
+        row[3] = f"${row[3]:,.2f}"
+        row.append(f"${savings:,.2f} ({savings / static_cost:.1%})" if static_cost else "N/A")
+
+    print(f"\nSimulated {len(token_rate)} intervals in {elapsed * 1000:.1f} ms")
+    print(tabulate(results, headers=[
+        'Policy',
+        'Replicas (min/avg/max)',
+        'GPU-Hours',
+        'Cost',
+        'SLA Violation',
+        'Savings vs Static',
+    ], tablefmt='orgtbl'))
+
+def load_token_rate(path):
+    """Load the token rate time series from a CSV/TSV file.
+
+    Returns the token rates and the interval in seconds between rows, taken
+    from the median step of an optional timestamp column (None without one).
+    """
+    delimiter = '\t' if path.endswith('.tsv') else ','
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f, delimiter=delimiter))
+
+    if not rows:
+        raise ValueError(f"Load file '{path}' has no rows")
+
+    token_rate = np.array([float(row['token_rate']) for row in rows])
+
+    interval_s = None
+    if 'timestamp' in rows[0] and len(rows) > 1:
+        timestamps = np.array([datetime.fromisoformat(row['timestamp']).timestamp() for row in rows])
+        interval_s = float(np.median(np.diff(timestamps)))
+        if interval_s <= 0:
+            raise ValueError(f"Load file '{path}' has timestamps that are not increasing")
+
+    return token_rate, interval_s
+
+def calc_replica_capacity(model_spec, gpu, precision, prompt_size, response_size, max_latency, num_gpu=None,
+                          attention='flash', workspace_gb=1.0):
+    """Calculate the sustainable token rate of one replica from the existing latency and memory model.
+
+    Memory reserves the workspace and the activations of one prefill chunk on
+    every GPU, and long prompts are prefilled in chunks, as in the GPU
+    requirements calculator. Without num_gpu, the replica is the GPU count up
+    to one node (or the smallest count that works, if larger) with the highest
+    capacity per GPU that meets the latency target.
+    """
+    gpu_perf = get_compute_perf_for_precision(gpu, precision)
+    if gpu_perf is None:
+        return f"{gpu['name']} does not support {precision} precision."
+
+    if num_gpu is not None:
+        replica = evaluate_replica(model_spec, gpu, gpu_perf, precision, prompt_size, response_size, num_gpu,
+                                   attention, workspace_gb)
+        if replica is None:
+            return f"{num_gpu}x {gpu['name']} cannot hold the model and one request."
+        return replica
+
+    candidates = []
+    for count in range(1, MAX_GPUS_PER_REPLICA + 1):
+        replica = evaluate_replica(model_spec, gpu, gpu_perf, precision, prompt_size, response_size, count,
+                                   attention, workspace_gb)
+        if replica is not None and replica['e2e_latency'] <= max_latency:
+            candidates.append(replica)
+            # Look beyond one node only until the first configuration that works
+            if count >= GPUS_PER_NODE:
+                break
+        elif count >= GPUS_PER_NODE and candidates:
+            break
+
+    if not candidates:
+        return (f"No replica of up to {MAX_GPUS_PER_REPLICA}x {gpu['name']} holds the model and one request "
+                f"within {max_latency} s.")
+
+    # Highest capacity per GPU, fewest GPUs on ties
+    return max(candidates, key=lambda r: (r['capacity'] / r['num_gpu'], -r['num_gpu']))
+
+def evaluate_replica(model_spec, gpu, gpu_perf, precision, prompt_size, response_size, num_gpu, attention, workspace_gb):
+    """Evaluate one replica of num_gpu GPUs; None if it cannot hold the model and one request."""
+    bytes_per_parameter = get_bytes_per_parameter(precision)
+    kv_cache_size_per_token = calc_kv_cache_size_per_token(
+        model_spec["n_layers"], model_spec["d_model"], bytes_per_parameter
+    )
+    context_window = prompt_size + response_size
+    model_memory = model_spec["params_billion"] * bytes_per_parameter
+
+    # Workspace and the activations of the smallest prefill chunk stay reserved on every GPU
+    required_chunk = min(prompt_size, MIN_PREFILL_CHUNK)
+    reserved_memory = workspace_gb + calc_prefill_activation_memory(
+        required_chunk, model_spec["d_model"], model_spec["n_heads"], num_gpu, bytes_per_parameter,
+        attention, seq_len=prompt_size
+    )
+    kv_cache_tokens = (num_gpu * (gpu["memory_gb"] - reserved_memory) - model_memory) / kv_cache_size_per_token
+    max_concurrent = int(kv_cache_tokens // context_window) if kv_cache_tokens > 0 else 0
+    if max_concurrent < 1:
+        return None
+
+    # Largest prefill batch next to the weights and the KV cache of all requests
+    free_memory = (gpu["memory_gb"] - workspace_gb -
+                   (model_memory + kv_cache_size_per_token * context_window * max_concurrent) / num_gpu)
+    batched_tokens = calc_max_batched_tokens(
+        free_memory, model_spec["d_model"], model_spec["n_heads"], num_gpu, bytes_per_parameter,
+        attention, limit=prompt_size * max_concurrent, seq_len=prompt_size
+    )
+
+    prefill_time = calc_prefill_time_per_token(num_gpu, model_spec["params_billion"], gpu_perf)
+    tpot = calc_tpot(num_gpu, model_spec["params_billion"], gpu["memory_bandwidth_gbps"])
+    prefill_total = calc_chunked_prefill_time(prompt_size, batched_tokens, prefill_time, tpot)
+    if isinstance(prefill_total, str):
+        return None
+    e2e_latency = (prefill_total + response_size * tpot) / 1000
+
+    return {
+        'num_gpu': num_gpu,
+        'max_concurrent': max_concurrent,
+        'e2e_latency': e2e_latency,
+        'capacity': max_concurrent * response_size / e2e_latency,
+    }
+
+def rolling_max(values, window):
+    """Calculate the maximum over the trailing window ending at every step."""
+    if window <= 1:
+        return values
+    padded = np.concatenate([np.full(window - 1, values[0]), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window).max(axis=1)
+
+def simulate_autoscaling(token_rate, replica_capacity, min_replicas, scale_up_delay_steps, cooldown_steps,
+                         target_utilization):
+    """Play a token rate time series against an autoscaling policy.
+
+    The autoscaler requests enough replicas to run at the target utilization
+    and only releases them once the demand stayed lower for the whole cooldown.
+    Requested replicas are billed immediately but serve traffic only after the
+    scale-up delay; released replicas stop serving and billing at once.
+
+    scale_up_delay_steps may be fractional: a replica requested at the start of
+    a step becomes ready that far into a later step, so the shortfall counts
+    as an SLA violation for that share of the step only.
+    """
+    desired = np.ceil(token_rate / (replica_capacity * target_utilization)).astype(int)
+    desired = np.maximum(desired, min_replicas)
+
+    # Scale down only after the cooldown: hold the highest request of the window
+    billed_replicas = rolling_max(desired, cooldown_steps)
+
+    def ready_after(delay_steps):
+        # Replicas requested delay_steps ago are ready now
+        if delay_steps <= 0:
+            return billed_replicas
+        requested_earlier = np.concatenate([np.full(delay_steps, billed_replicas[0]),
+                                            billed_replicas[:-delay_steps]])[:len(billed_replicas)]
+        return np.minimum(billed_replicas, requested_earlier)
+
+    # A replica requested whole_steps + partial steps ago is still starting for
+    # the first `partial` of the current step and serves for the rest of it
+    whole_steps = int(math.floor(scale_up_delay_steps))
+    partial = scale_up_delay_steps - whole_steps
+    ready_by_step_end = ready_after(whole_steps)
+    serving_replicas = ready_after(whole_steps + 1) if partial > 0 else ready_by_step_end
+
+    sla_violation = ((1 - partial) * (token_rate > ready_by_step_end * replica_capacity) +
+                     partial * (token_rate > serving_replicas * replica_capacity))
+
+    return {
+        'billed_replicas': billed_replicas,
+        'serving_replicas': serving_replicas,
+        'sla_violation': sla_violation,
+    }
+
+if __name__ == '__main__':
+    main()
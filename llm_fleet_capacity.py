@@ -0,0 +1,233 @@
+import argparse
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+    calc_prefill_activation_memory,
+    calc_max_batched_tokens,
+    calc_chunked_prefill_time,
+    MIN_PREFILL_CHUNK,
+)
+
+GIB_TO_GB = 1.073741824
+
+def main():
+    parser = argparse.ArgumentParser(description='Maximum Sustainable Load Solver for an Existing GPU Fleet')
+    parser.add_argument('--gpu', type=str, required=True, help='Deployed GPU model')
+    parser.add_argument('-g', '--num_gpu', type=int, required=True, help='Number of deployed GPUs serving each model')
+    parser.add_argument('-l', '--max_latency', type=float, required=True, help='Maximum acceptable E2E latency (seconds)')
+    parser.add_argument('--max_ttft', type=float, default=None, help='Maximum acceptable TTFT (seconds, optional)')
+    parser.add_argument('-p', '--prompt_sz', type=int, default=4096, help='Prompt size in tokens')
+    parser.add_argument('-r', '--response_sz', type=int, default=256, help='Response size in tokens')
+    parser.add_argument('-c', '--n_concurrent_req', type=int, default=1,
+                        help='Concurrent requests assumed when solving for the maximum prompt size')
+    parser.add_argument('-w', '--precision', type=str, default='fp16',
+                        choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'],
+                        help='Precision level to use for calculations')
+    parser.add_argument('--attention', type=str, default='flash', choices=['flash', 'naive'],
+                        help='Attention implementation; naive attention materializes the attention scores')
+    parser.add_argument('--workspace_gb', type=float, default=1.0,
+                        help='Framework workspace memory per GPU (GB)')
+    parser.add_argument('--kv_reads', action='store_true',
+                        help='Add reading the KV cache of the batch to decode time (not in the GPU requirements calculator)')
+
+    args = parser.parse_args()
+
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    gpu = next((g for g in gpu_specs if g["name"].lower() == args.gpu.lower()), None)
+    if gpu is None:
+        print(f"Error: GPU '{args.gpu}' not found in database.")
+        print("Available GPUs:")
+        for g in gpu_specs:
+            print(f"- {g['name']}")
+        return
+
+    gpu_perf = get_compute_perf_for_precision(gpu, args.precision)
+    if gpu_perf is None:
+        print(f"Error: {gpu['name']} does not support {args.precision} precision.")
+        return
+
+    print(f"\n*** Maximum Sustainable Load on {args.num_gpu}x {gpu['name']} ***")
+    print(f"Maximum latency: {args.max_latency} seconds" +
+          (f", maximum TTFT: {args.max_ttft} seconds" if args.max_ttft is not None else ""))
+    print(f"Prompt size: {args.prompt_sz} tokens, Response size: {args.response_sz} tokens")
+    print(f"Precision: {args.precision}, attention: {args.attention}, workspace: {args.workspace_gb} GB per GPU, "
+          f"decode reads KV cache: {'Yes' if args.kv_reads else 'No'}")
+
+    fleet = FleetModel(model_specs, gpu, gpu_perf, args.num_gpu, args.precision, args.max_latency,
+                       args.max_ttft, args.attention, args.workspace_gb, args.kv_reads)
+    prompt_sz = np.full(len(model_specs), args.prompt_sz)
+    response_sz = np.full(len(model_specs), args.response_sz)
+    kv_cache_tokens = fleet.kv_cache_tokens(prompt_sz)
+
+    # Largest concurrency at the given workload, then the token rate it sustains
+    max_concurrent = bisect_max(
+        lambda n: fleet.feasible(n, prompt_sz, response_sz),
+        np.ones(len(model_specs), dtype=np.int64),
+        np.maximum(kv_cache_tokens // (prompt_sz + response_sz), 0).astype(np.int64),
+    )
+    e2e_latency = fleet.e2e_latency(max_concurrent, prompt_sz, response_sz)
+    max_token_rate = np.where(max_concurrent > 0, max_concurrent * response_sz / e2e_latency, 0.0)
+    limited_by = fleet.limiting_constraint(max_concurrent + 1, prompt_sz, response_sz)
+
+    # Largest prompt at the given concurrency
+    concurrent = np.full(len(model_specs), args.n_concurrent_req)
+    max_prompt = bisect_max(
+        lambda p: fleet.feasible(concurrent, p, response_sz),
+        np.ones(len(model_specs), dtype=np.int64),
+        np.maximum(fleet.max_context_window - response_sz, 0).astype(np.int64),
+    )
+    prompt_limited_by = fleet.limiting_constraint(concurrent, max_prompt + 1, response_sz)
+
+    results = []
+    for i, model in enumerate(model_specs):
+        if kv_cache_tokens[i] <= 0:
+            results.append([model["name"], "OOM", 0, "N/A", "N/A", "Memory", "N/A", "Memory"])
+            continue
+        results.append([
+            model["name"],
+            "Fits",
+            int(max_concurrent[i]),
+            f"{max_token_rate[i]:.2f} tokens/s" if max_concurrent[i] > 0 else "N/A",
+            f"{e2e_latency[i]:.3f} s" if max_concurrent[i] > 0 else "N/A",
+            limited_by[i],
+            int(max_prompt[i]) if max_prompt[i] > 0 else "N/A",
+            prompt_limited_by[i],
+        ])
+
+    print("\nFleet Capacity per Model:")
+    print(tabulate(results, headers=[
+        'Model',
+        'Memory Status',
+        'Max Concurrent',
+        'Max Token Rate',
+        'E2E Latency',
+        'Limited By',
+        f'Max Prompt (c={args.n_concurrent_req})',
+        'Prompt Limited By',
+    ], tablefmt='orgtbl'))
+
+def bisect_max(feasible, lo, hi):
+    """Find the largest integer in [lo, hi] for which `feasible` holds, per element.
+
+    `feasible` takes an integer array and returns a boolean array; it must be
+    true up to some point and false after it. Elements with no feasible value
+    return lo - 1. All elements are searched at once.
+    """
+    lo = np.asarray(lo, dtype=np.int64).copy()
+    hi = np.asarray(hi, dtype=np.int64).copy()
+    best = lo - 1
+    while np.any(lo <= hi):
+        active = lo <= hi
+        mid = np.where(active, (lo + hi) // 2, lo)
+        ok = feasible(mid) & active
+        best = np.where(ok, mid, best)
+        lo = np.where(ok, mid + 1, lo)
+        hi = np.where(active & ~ok, mid - 1, hi)
+    return best
+
+class FleetModel:
+    """Latency and memory model of every catalog model on one fixed GPU deployment.
+
+    Follows the GPU requirements calculator: every GPU reserves the workspace
+    and the activations of one prefill chunk, and prompts are prefilled in
+    chunks of the largest batch that fits next to the KV cache.
+    """
+
+    def __init__(self, model_specs, gpu, gpu_perf, num_gpu, precision, max_latency, max_ttft,
+                 attention='flash', workspace_gb=1.0, kv_reads=False):
+        self.bytes_per_parameter = get_bytes_per_parameter(precision)
+        params_billion = np.array([m["params_billion"] for m in model_specs], dtype=float)
+        self.d_model = np.array([m["d_model"] for m in model_specs], dtype=float)
+        self.n_heads = np.array([m["n_heads"] for m in model_specs], dtype=float)
+        self.kv_cache_size_per_token = calc_kv_cache_size_per_token(
+            np.array([m["n_layers"] for m in model_specs], dtype=float),
+            self.d_model,
+            self.bytes_per_parameter,
+        )
+        self.max_context_window = np.array([m["max_context_window"] for m in model_specs])
+        self.model_memory = params_billion * self.bytes_per_parameter
+        self.memory_gb = gpu["memory_gb"]
+        self.num_gpu = num_gpu
+        self.prefill_time = calc_prefill_time_per_token(num_gpu, params_billion, gpu_perf)
+        self.tpot = calc_tpot(num_gpu, params_billion, gpu["memory_bandwidth_gbps"])
+        self.bandwidth_gbps = num_gpu * gpu["memory_bandwidth_gbps"]
+        self.max_latency = max_latency
+        self.max_ttft = max_ttft
+        self.attention = attention
+        self.workspace_gb = workspace_gb
+        self.kv_reads = kv_reads
+
+    def kv_cache_tokens(self, prompt_sz):
+        """Calculate the KV cache capacity in tokens after the weights and the per-GPU reserve."""
+        required_chunk = np.minimum(prompt_sz, MIN_PREFILL_CHUNK)
+        reserved_memory = self.workspace_gb + calc_prefill_activation_memory(
+            required_chunk, self.d_model, self.n_heads, self.num_gpu, self.bytes_per_parameter,
+            self.attention, seq_len=prompt_sz
+        )
+        return (self.num_gpu * (self.memory_gb - reserved_memory) - self.model_memory) / self.kv_cache_size_per_token
+
+    def prefill_total(self, n_concurrent, prompt_sz, response_sz):
+        """Calculate chunked prefill time of one prompt in milliseconds with n_concurrent requests resident."""
+        kv_memory = self.kv_cache_size_per_token * (prompt_sz + response_sz) * n_concurrent
+        free_memory = self.memory_gb - self.workspace_gb - (self.model_memory + kv_memory) / self.num_gpu
+        batched_tokens = calc_max_batched_tokens(
+            free_memory, self.d_model, self.n_heads, self.num_gpu, self.bytes_per_parameter, self.attention,
+            limit=np.maximum(prompt_sz * n_concurrent, 0), seq_len=prompt_sz
+        )
+        return calc_chunked_prefill_time(prompt_sz, batched_tokens, self.prefill_time, self.tpot)
+
+    def decode_time(self, n_concurrent, prompt_sz, response_sz):
+        """Calculate time per output token in milliseconds with n_concurrent requests in the batch."""
+        if not self.kv_reads:
+            return self.tpot * np.ones_like(n_concurrent, dtype=float)
+        # Every decode step also reads the KV cache of the whole batch at its average length
+        avg_context = prompt_sz + response_sz / 2
+        kv_read_gb = n_concurrent * avg_context * self.kv_cache_size_per_token * GIB_TO_GB
+        return self.tpot + kv_read_gb / self.bandwidth_gbps * 1000
+
+    def ttft(self, n_concurrent, prompt_sz, response_sz):
+        """Calculate time to first token in seconds."""
+        return (self.prefill_total(n_concurrent, prompt_sz, response_sz) +
+                self.decode_time(n_concurrent, prompt_sz, response_sz)) / 1000
+
+    def e2e_latency(self, n_concurrent, prompt_sz, response_sz):
+        """Calculate end-to-end latency in seconds."""
+        return (self.prefill_total(n_concurrent, prompt_sz, response_sz) +
+                response_sz * self.decode_time(n_concurrent, prompt_sz, response_sz)) / 1000
+
+    def constraints(self, n_concurrent, prompt_sz, response_sz):
+        """Evaluate each constraint; True means it holds."""
+        constraints = {
+            'Memory': n_concurrent * (prompt_sz + response_sz) <= self.kv_cache_tokens(prompt_sz),
+            'Context': prompt_sz + response_sz <= self.max_context_window,
+            'Latency': self.e2e_latency(n_concurrent, prompt_sz, response_sz) <= self.max_latency,
+        }
+        if self.max_ttft is not None:
+            constraints['TTFT'] = self.ttft(n_concurrent, prompt_sz, response_sz) <= self.max_ttft
+        return constraints
+
+    def feasible(self, n_concurrent, prompt_sz, response_sz):
+        """Check whether the workload fits in memory and meets the latency SLA."""
+        return np.logical_and.reduce(list(self.constraints(n_concurrent, prompt_sz, response_sz).values()))
+
+    def limiting_constraint(self, n_concurrent, prompt_sz, response_sz):
+        """Name the first constraint that fails, per model."""
+        constraints = self.constraints(n_concurrent, prompt_sz, response_sz)
+        names = []
+        for i in range(len(self.max_context_window)):
+            failed = [name for name, holds in constraints.items() if not holds[i]]
+            names.append(failed[0] if failed else "None")
+        return names
+
+if __name__ == '__main__':
+    main()
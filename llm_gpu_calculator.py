@@ -1,6 +1,10 @@
 import argparse
 from tabulate import tabulate
 import math
+import numpy as np
+
+# Smallest prefill chunk a configuration must fit when no chunk size is given
+MIN_PREFILL_CHUNK = 512
 
 def main():
     parser = argparse.ArgumentParser(description='Calculate GPU Requirements for LLM Performance Targets')
@@ -14,6 +18,12 @@ def main():
                         help='Precision level to use for calculations')
     parser.add_argument('-c', '--max_concurrent', type=int, default=None, 
                         help='Maximum concurrent requests (calculated from token rate if not specified)')
+    parser.add_argument('-b', '--max_batched_tokens', type=int, default=None,
+                        help='Maximum tokens per prefill batch (largest that fits in memory if not specified)')
+    parser.add_argument('--attention', type=str, default='flash', choices=['flash', 'naive'],
+                        help='Attention implementation; naive attention materializes the attention scores')
+    parser.add_argument('--workspace_gb', type=float, default=1.0,
+                        help='Framework workspace memory per GPU (GB)')
 
     args = parser.parse_args()
 
@@ -24,6 +34,9 @@ def main():
     response_size = args.response_sz
     precision = args.precision
     max_concurrent = args.max_concurrent
+    max_batched_tokens = args.max_batched_tokens
+    attention = args.attention
+    workspace_gb = args.workspace_gb
 
     # Load GPU and model specifications
     gpu_specs = load_gpu_specs()
@@ -85,6 +98,10 @@ def main():
     print(f"Memory per request: {memory_per_request:.2f} GB")
     print(f"Model parameters: {model_memory:.2f} GB")
     print(f"Total memory required: {total_memory_required:.2f} GB")
+    print(f"Prefill workspace per GPU: {workspace_gb:.2f} GB, attention: {attention}")
+
+    # Every configuration must fit the activations of at least this prefill chunk
+    required_chunk = max_batched_tokens if max_batched_tokens is not None else min(prompt_size, MIN_PREFILL_CHUNK)
 
     results = []
     
@@ -119,8 +136,20 @@ def main():
         # Check if this configuration meets latency requirements
         meets_latency = e2e_latency <= max_latency
         
-        # Calculate GPUs needed for memory
+        # Calculate GPUs needed for memory, including the workspace and the
+        # activations of one prefill chunk on every GPU
         gpus_for_memory = math.ceil(total_memory_required / gpu["memory_gb"])
+        while gpus_for_memory <= 128:  # Practical limit
+            free_memory = gpu["memory_gb"] - total_memory_required / gpus_for_memory - workspace_gb
+            activation_memory = calc_prefill_activation_memory(
+                required_chunk, model_spec["d_model"], model_spec["n_heads"], gpus_for_memory,
+                bytes_per_parameter, attention, seq_len=prompt_size
+            )
+            if activation_memory <= free_memory:
+                break
+            gpus_for_memory += 1
+        # The required prefill chunk does not fit within the practical limit
+        chunk_fits = gpus_for_memory <= 128
         
         # The total GPUs needed is the max of compute and memory requirements
         gpus_needed = max(min_gpus_for_compute, gpus_for_memory)
@@ -129,7 +158,27 @@ def main():
         # Adjust prefill and tpot for the actual number of GPUs
         actual_prefill = calc_prefill_time_per_token(gpus_needed, model_spec["params_billion"], gpu_perf)
         actual_tpot = calc_tpot(gpus_needed, model_spec["params_billion"], gpu["memory_bandwidth_gbps"])
-        actual_e2e = calc_e2e_latency(actual_prefill, actual_tpot, prompt_size, response_size)
+
+        # Largest prefill batch that fits next to the weights and KV cache,
+        # capped by the configured chunk size and by all prompts in flight
+        free_memory = gpu["memory_gb"] - total_memory_required / gpus_needed - workspace_gb
+        batched_tokens = calc_max_batched_tokens(
+            free_memory, model_spec["d_model"], model_spec["n_heads"], gpus_needed, bytes_per_parameter,
+            attention, limit=max_batched_tokens if max_batched_tokens is not None else prompt_size * max_concurrent,
+            seq_len=prompt_size
+        )
+        # Peak activation memory of the prefill batch being sized for
+        activation_memory = calc_prefill_activation_memory(
+            batched_tokens, model_spec["d_model"], model_spec["n_heads"], gpus_needed,
+            bytes_per_parameter, attention, seq_len=prompt_size
+        )
+
+        # Prompts longer than the prefill batch are processed in chunks
+        prefill_total = calc_chunked_prefill_time(prompt_size, batched_tokens, actual_prefill, actual_tpot)
+        if isinstance(prefill_total, str):
+            actual_e2e = "N/A"
+        else:
+            actual_e2e = (prefill_total + response_size * actual_tpot) / 1000
         
         # The throughput is the number of tokens generated per second
         if isinstance(actual_e2e, str):
@@ -138,9 +187,12 @@ def main():
         else:
             throughput = response_size / actual_e2e * max_concurrent
             meets_requirements = actual_e2e <= max_latency and throughput >= token_rate
+        # A configuration that cannot fit the required prefill chunk is never viable
+        if not chunk_fits or batched_tokens < required_chunk:
+            meets_requirements = False
         
         # Time to first token
-        ttft = (actual_prefill * prompt_size / 1000) + (actual_tpot / 1000)
+        ttft = (prefill_total / 1000) + (actual_tpot / 1000) if not isinstance(prefill_total, str) else prefill_total
         
         # Calculate cost metrics
         if isinstance(gpus_needed, int):
@@ -163,7 +215,9 @@ def main():
             f"{actual_e2e:.3f} s" if not isinstance(actual_e2e, str) else actual_e2e,
             f"{throughput:.2f} tokens/s" if not isinstance(throughput, str) else throughput,
             f"${monthly_opex:,.2f}" if not isinstance(monthly_opex, str) else monthly_opex,
-            f"${total_capex:,.2f}" if not isinstance(total_capex, str) else total_capex
+            f"${total_capex:,.2f}" if not isinstance(total_capex, str) else total_capex,
+            batched_tokens if batched_tokens > 0 else "OOM",
+            f"{activation_memory:.2f} GB"
         ])
     
     # Sort results by GPUs needed (ascending)
@@ -183,7 +237,9 @@ def main():
         'E2E Latency',
         'Throughput',
         'Monthly Opex',
-        'Total Capex'
+        'Total Capex',
+        'Max Batched Tokens',
+        'Prefill Activation'
     ], tablefmt='orgtbl'))
     
     # Print recommendation
@@ -279,12 +335,12 @@ def calc_prefill_time_per_token(num_gpu, model_params_billion, gpu_perf):
     if gpu_perf is None:
         return "Not Supported"
     result = (2 * model_params_billion / num_gpu) / gpu_perf
-    return result if result >= 0 else "OOM"
+    return result if not np.any(result < 0) else "OOM"
 
 def calc_tpot(num_gpu, model_params_billion, memory_bandwidth_gbps):
     """Calculate time per output token (TPOT) in milliseconds."""
     result = (2 * model_params_billion / num_gpu) / memory_bandwidth_gbps * 1000
-    return result if result >= 0 else "OOM"
+    return result if not np.any(result < 0) else "OOM"
 
 def calc_e2e_latency(prefill_time_per_token, tpot, prompt_size, response_size):
     """Calculate end-to-end latency in seconds."""
@@ -292,5 +348,61 @@ def calc_e2e_latency(prefill_time_per_token, tpot, prompt_size, response_size):
         return "N/A"
     return (prompt_size * prefill_time_per_token + response_size * tpot) / 1000
 
+def calc_prefill_activation_memory(n_tokens, d_model, n_heads, num_gpu, bytes_per_parameter, attention='flash', ffn_mult=3.5, seq_len=None):
+    """Calculate peak activation memory per GPU in GB for a prefill batch of n_tokens.
+
+    seq_len is the prompt length the batch attends to: a chunk of a longer
+    prompt attends to the whole prefix, and a batch of several prompts to each
+    prompt. Defaults to a single sequence of n_tokens.
+    """
+    BYTES_IN_GB = 1_073_741_824
+    # Activations stay in 16-bit even when the weights are stored in 8 bits
+    activation_bytes = max(bytes_per_parameter, 2)
+    # Hidden states and their normalized copy are replicated on every GPU
+    hidden = 2 * n_tokens * d_model
+    # Q, K, V and the attention output are split across GPUs by tensor parallelism
+    attention_activations = 4 * n_tokens * d_model / num_gpu
+    if attention == 'naive':
+        # Attention scores and softmax probabilities for every head, against all keys of the sequence
+        seq_len = n_tokens if seq_len is None else seq_len
+        attention_activations = attention_activations + 2 * (n_heads / num_gpu) * n_tokens * seq_len
+    # Gate, up and activated MLP intermediates
+    mlp_activations = 3 * n_tokens * ffn_mult * d_model / num_gpu
+    # Layers run one at a time, so only the larger block of one layer is live
+    return (hidden + np.maximum(attention_activations, mlp_activations)) * activation_bytes / BYTES_IN_GB
+
+def calc_max_batched_tokens(free_memory_gb, d_model, n_heads, num_gpu, bytes_per_parameter, attention='flash', limit=1 << 24, seq_len=None):
+    """Calculate the largest prefill batch in tokens whose activations fit in free_memory_gb per GPU.
+
+    Accepts scalars or numpy arrays; every element is bisected at once.
+    """
+    shape = np.broadcast_shapes(*(np.shape(x) for x in (free_memory_gb, d_model, n_heads, num_gpu, limit, seq_len)))
+    low = np.zeros(shape, dtype=np.int64)
+    high = np.broadcast_to(np.asarray(limit, dtype=np.int64), shape).copy()
+    while np.any(low < high):
+        active = low < high
+        mid = (low + high + 1) // 2
+        fits = calc_prefill_activation_memory(mid, d_model, n_heads, num_gpu, bytes_per_parameter, attention, seq_len=seq_len) <= free_memory_gb
+        low = np.where(active & fits, mid, low)
+        high = np.where(active & ~fits, mid - 1, high)
+    return int(low) if low.ndim == 0 else low
+
+def calc_chunked_prefill_time(prompt_size, max_batched_tokens, prefill_time_per_token, tpot):
+    """Calculate prefill time in milliseconds for a prompt split into chunks of max_batched_tokens.
+
+    Accepts scalars or numpy arrays; array elements with no room for a chunk take forever.
+    """
+    if isinstance(prefill_time_per_token, str) or isinstance(tpot, str):
+        return "N/A"
+    if np.ndim(max_batched_tokens) == 0 and max_batched_tokens <= 0:
+        return "N/A"
+    chunk = np.maximum(max_batched_tokens, 1)
+    full_chunks, remainder = np.divmod(prompt_size, chunk)
+    # Every chunk reads all weights once, so it is never faster than a decode step
+    prefill_time = full_chunks * np.maximum(chunk * prefill_time_per_token, tpot)
+    prefill_time = prefill_time + np.where(remainder > 0, np.maximum(remainder * prefill_time_per_token, tpot), 0)
+    prefill_time = np.where(np.asarray(max_batched_tokens) > 0, prefill_time, np.inf)
+    return float(prefill_time) if np.ndim(prefill_time) == 0 else prefill_time
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
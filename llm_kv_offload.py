@@ -0,0 +1,238 @@
+import argparse
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+)
+
+# Number of offload fractions of the active KV cache evaluated per configuration
+OFFLOAD_GRID_POINTS = 101
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiered KV Cache Offload Calculator for LLMs')
+    parser.add_argument('-m', '--model', type=str, required=True, help='Model name')
+    parser.add_argument('-g', '--num_gpu', type=int, default=1, help='Number of GPUs')
+    parser.add_argument('-p', '--prompt_sz', type=int, default=4096, help='Prompt size in tokens')
+    parser.add_argument('-r', '--response_sz', type=int, default=256, help='Response size in tokens')
+    parser.add_argument('-w', '--precision', type=str, default='fp16',
+                        choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'],
+                        help='Precision level to use for calculations')
+    parser.add_argument('--active_fraction', type=float, default=0.25,
+                        help='Fraction of sessions (0 to 1) that are generating at any time; the rest are idle (cold)')
+    parser.add_argument('--max_ttft', type=float, default=2.0,
+                        help='Maximum acceptable TTFT in seconds, including reloading a cold session')
+    parser.add_argument('--max_tpot', type=float, default=50.0,
+                        help='Maximum acceptable TPOT in milliseconds')
+    parser.add_argument('--c2c_bw_gbps', type=float, default=450,
+                        help='Grace to GPU NVLink-C2C bandwidth per GPU and direction (GB/s)')
+    parser.add_argument('--host_memory_gb', type=float, default=256,
+                        help='Host DRAM available for KV cache per GPU on non-Grace systems (GB)')
+    parser.add_argument('--host_bw_gbps', type=float, default=64,
+                        help='Host to GPU PCIe bandwidth per GPU and direction (GB/s)')
+    parser.add_argument('--nvme_gb', type=float, default=0,
+                        help='NVMe capacity available for KV cache per GPU (GB, 0 disables the tier)')
+    parser.add_argument('--nvme_bw_gbps', type=float, default=7,
+                        help='NVMe read bandwidth per GPU (GB/s)')
+
+    args = parser.parse_args()
+
+    model_name = args.model
+    num_gpu = args.num_gpu
+    prompt_size = args.prompt_sz
+    response_size = args.response_sz
+    precision = args.precision
+    active_fraction = args.active_fraction
+
+    if not 0 <= active_fraction <= 1:
+        print(f"Error: --active_fraction must be between 0 and 1, got {active_fraction}")
+        return
+
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    # Find the specified model in our database
+    model_spec = None
+    for model in model_specs:
+        if model["name"].lower() == model_name.lower():
+            model_spec = model
+            break
+
+    if model_spec is None:
+        print(f"Error: Model '{model_name}' not found in database.")
+        print("Available models:")
+        for model in model_specs:
+            print(f"- {model['name']}")
+        return
+
+    print(f"\n*** Tiered KV Cache Offload for {model_spec['name']} ***")
+    print(f"num_gpu = {num_gpu}, prompt_size = {prompt_size} tokens, response_size = {response_size} tokens")
+    print(f"Precision: {precision}, active sessions: {active_fraction:.0%}")
+    print(f"SLA: TTFT <= {args.max_ttft} s, TPOT <= {args.max_tpot} ms")
+
+    bytes_per_parameter = get_bytes_per_parameter(precision)
+    kv_cache_size_per_token = calc_kv_cache_size_per_token(
+        model_spec["n_layers"], model_spec["d_model"], bytes_per_parameter
+    )
+    context_window = prompt_size + response_size
+    session_kv_gb = kv_cache_size_per_token * context_window
+    model_memory = model_spec["params_billion"] * bytes_per_parameter
+    print(f"KV cache per session: {session_kv_gb:.2f} GB")
+
+    results = []
+    for gpu in gpu_specs:
+        # Skip GPUs that don't support the specified precision
+        gpu_perf = get_compute_perf_for_precision(gpu, precision)
+        if gpu_perf is None:
+            continue
+
+        hbm_free_gb = num_gpu * gpu["memory_gb"] - model_memory
+        if hbm_free_gb < session_kv_gb:
+            results.append([gpu["name"], "OOM"] + ["N/A"] * 8)
+            continue
+
+        tiers = get_memory_tiers(gpu, num_gpu, hbm_free_gb, args)
+        prefill_time = calc_prefill_time_per_token(num_gpu, model_spec["params_billion"], gpu_perf)
+        tpot = calc_tpot(num_gpu, model_spec["params_billion"], gpu["memory_bandwidth_gbps"])
+        ttft = (prompt_size * prefill_time + tpot) / 1000
+        # Recomputing a cold session means prefilling its whole context again
+        recompute_time = context_window * prefill_time / 1000
+
+        split = calc_offload_split(tiers, session_kv_gb, active_fraction, ttft, tpot, recompute_time,
+                                   args.max_ttft, args.max_tpot)
+        if split is None:
+            results.append([gpu["name"], "SLA Miss"] + ["N/A"] * 8)
+            continue
+
+        hbm_only_sessions = int(hbm_free_gb // session_kv_gb)
+        cold_by_tier = " / ".join(f"{n}" for n in split["cold_sessions"])
+        results.append([
+            gpu["name"],
+            "Fits",
+            hbm_only_sessions,
+            split["sessions"],
+            split["active_sessions"],
+            f"{split['offload_fraction']:.0%} to {tiers[1]['name']}",
+            cold_by_tier,
+            " / ".join(f"{gb:.0f}" for gb in split["memory_gb"]),
+            f"{split['tpot']:.3f} ms",
+            f"{split['resume_ttft']:.3f} s",
+        ])
+
+    print("\nTiered KV Cache Capacity (tiers: HBM / Grace or Host DRAM / NVMe):")
+    print(tabulate(results, headers=[
+        'GPU Model',
+        'Memory Status',
+        'Sessions (HBM Only)',
+        'Sessions (Tiered)',
+        'Active Sessions',
+        'Active KV Offload',
+        'Cold Sessions per Tier',
+        'KV Cache per Tier (GB)',
+        'TPOT',
+        'Resume TTFT (worst)',
+    ], tablefmt='orgtbl'))
+
+def get_memory_tiers(gpu, num_gpu, hbm_free_gb, args):
+    """Describe the KV cache memory tiers of a GPU configuration, fastest first."""
+    # Grace systems reach LPDDR over NVLink-C2C; other systems reach host DRAM over PCIe
+    if gpu.get("grace_memory_gb"):
+        second_tier = {"name": "Grace", "capacity_gb": num_gpu * gpu["grace_memory_gb"],
+                       "bandwidth_gbps": num_gpu * args.c2c_bw_gbps}
+    else:
+        second_tier = {"name": "Host", "capacity_gb": num_gpu * args.host_memory_gb,
+                       "bandwidth_gbps": num_gpu * args.host_bw_gbps}
+    return [
+        {"name": "HBM", "capacity_gb": hbm_free_gb, "bandwidth_gbps": num_gpu * gpu["memory_bandwidth_gbps"]},
+        second_tier,
+        {"name": "NVMe", "capacity_gb": num_gpu * args.nvme_gb, "bandwidth_gbps": num_gpu * args.nvme_bw_gbps},
+    ]
+
+def calc_offload_split(tiers, session_kv_gb, active_fraction, ttft, tpot, recompute_time, max_ttft, max_tpot):
+    """Find the tier split that maximizes concurrent sessions under the latency SLA.
+
+    Active sessions keep a fraction `f` of their KV cache in the second tier and
+    stream it over the link on every decode step, which adds to TPOT. Cold
+    sessions are parked in any tier whose reload time still meets the TTFT SLA
+    and beats recomputing the prefill. All offload fractions are evaluated at once.
+    """
+    if tpot > max_tpot:
+        return None
+
+    hbm, second, nvme = tiers
+    reload_time = np.array([session_kv_gb / tier["bandwidth_gbps"] for tier in tiers])
+    # HBM-resident cold sessions resume without a reload
+    reload_time[0] = 0.0
+    usable = (ttft + reload_time <= max_ttft) & (reload_time <= recompute_time)
+    usable[0] = ttft <= max_ttft
+    if not usable[0]:
+        return None
+    usable &= np.array([tier["capacity_gb"] > 0 for tier in tiers])
+
+    f = np.linspace(0, 1, OFFLOAD_GRID_POINTS) if second["capacity_gb"] > 0 else np.zeros(1)
+    a = active_fraction
+    kv = session_kv_gb
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Active share of HBM and of the second tier
+        limit_hbm = hbm["capacity_gb"] / (a * (1 - f) * kv)
+        limit_second = np.where(f > 0, second["capacity_gb"] / (a * f * kv), np.inf)
+        # Everything, cold sessions included, must fit in the tiers cold sessions may use
+        pool_gb = hbm["capacity_gb"] + usable[1] * second["capacity_gb"] + usable[2] * nvme["capacity_gb"]
+        limit_total = pool_gb / (kv * ((1 - a) + a * (1 - f) + usable[1] * a * f))
+        # Streaming the offloaded share of every active session on each decode step
+        limit_tpot = np.where(f > 0, (max_tpot - tpot) * second["bandwidth_gbps"] / (1000 * a * f * kv), np.inf)
+
+    sessions = np.floor(np.nan_to_num(np.minimum.reduce([limit_hbm, limit_second, limit_total, limit_tpot]),
+                                      posinf=0.0))
+    # Prefer the smallest offload fraction among equally good splits
+    best = int(np.argmax(sessions))
+    total_sessions = int(sessions[best])
+    if total_sessions < 1:
+        return None
+
+    offload_fraction = f[best]
+    # Rounding down keeps the active share within the limits the split was chosen for
+    active_sessions = int(np.floor(a * total_sessions))
+    cold_sessions = total_sessions - active_sessions
+
+    # Park cold sessions fastest tier first
+    free_gb = np.array([
+        hbm["capacity_gb"] - active_sessions * (1 - offload_fraction) * kv,
+        second["capacity_gb"] - active_sessions * offload_fraction * kv,
+        nvme["capacity_gb"],
+    ])
+    cold_capacity = np.where(usable, np.floor(np.maximum(free_gb, 0) / kv), 0).astype(int)
+    cold_per_tier = []
+    remaining = cold_sessions
+    for capacity in cold_capacity:
+        placed = min(remaining, capacity)
+        cold_per_tier.append(int(placed))
+        remaining -= placed
+
+    memory_gb = [
+        (active_sessions * (1 - offload_fraction) + cold_per_tier[0]) * kv,
+        (active_sessions * offload_fraction + cold_per_tier[1]) * kv,
+        cold_per_tier[2] * kv,
+    ]
+    resumed_tiers = [i for i, n in enumerate(cold_per_tier) if n > 0]
+    worst_reload = max((reload_time[i] for i in resumed_tiers), default=0.0)
+
+    return {
+        'sessions': active_sessions + sum(cold_per_tier),
+        'active_sessions': active_sessions,
+        'cold_sessions': cold_per_tier,
+        'offload_fraction': offload_fraction,
+        'memory_gb': memory_gb,
+        'tpot': tpot + active_sessions * offload_fraction * kv / second["bandwidth_gbps"] * 1000,
+        'resume_ttft': ttft + worst_reload,
+    }
+
+if __name__ == '__main__':
+    main()
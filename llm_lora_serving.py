@@ -0,0 +1,231 @@
+import argparse
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+    calc_e2e_latency,
+)
+
+LORA_TARGET_MODULES = ['q', 'k', 'v', 'o', 'gate', 'up', 'down']
+
+def main():
+    parser = argparse.ArgumentParser(description='Multi-LoRA Adapter Serving Capacity Calculator for LLMs')
+    parser.add_argument('-m', '--model', type=str, required=True, help='Base model name')
+    parser.add_argument('-g', '--num_gpu', type=int, default=1, help='Number of GPUs')
+    parser.add_argument('-l', '--max_latency', type=float, required=True, help='Maximum acceptable E2E latency (seconds)')
+    parser.add_argument('-p', '--prompt_sz', type=int, default=4096, help='Prompt size in tokens')
+    parser.add_argument('-r', '--response_sz', type=int, default=256, help='Response size in tokens')
+    parser.add_argument('-w', '--precision', type=str, default='fp16',
+                        choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'],
+                        help='Precision level to use for calculations')
+    parser.add_argument('--rank', type=int, default=16, help='LoRA rank')
+    parser.add_argument('--target_modules', type=str, default='q,k,v,o',
+                        help=f"Comma-separated LoRA target modules out of {','.join(LORA_TARGET_MODULES)}")
+    parser.add_argument('--n_adapters', type=int, default=100, help='Number of adapters served')
+    parser.add_argument('--hot_set', type=int, default=None,
+                        help='Adapters resident in GPU memory (solved for if not specified)')
+    parser.add_argument('--zipf', type=float, default=1.0,
+                        help='Zipf exponent of adapter popularity (0 for uniform)')
+    parser.add_argument('--ffn_mult', type=float, default=3.5,
+                        help='MLP hidden size as a multiple of d_model, used for gate/up/down modules')
+    parser.add_argument('--host_bw_gbps', type=float, default=64,
+                        help='Host to GPU bandwidth for adapter swap-in (GB/s)')
+    parser.add_argument('--max_concurrent', type=int, default=256,
+                        help='Largest number of concurrent requests considered')
+
+    args = parser.parse_args()
+
+    model_name = args.model
+    num_gpu = args.num_gpu
+    max_latency = args.max_latency
+    prompt_size = args.prompt_sz
+    response_size = args.response_sz
+    precision = args.precision
+    n_adapters = args.n_adapters
+
+    target_modules = [module.strip() for module in args.target_modules.split(',') if module.strip()]
+    unknown = [module for module in target_modules if module not in LORA_TARGET_MODULES]
+    if unknown:
+        print(f"Error: Unknown LoRA target modules: {', '.join(unknown)}")
+        return
+
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    # Find the specified model in our database
+    model_spec = None
+    for model in model_specs:
+        if model["name"].lower() == model_name.lower():
+            model_spec = model
+            break
+
+    if model_spec is None:
+        print(f"Error: Model '{model_name}' not found in database.")
+        print("Available models:")
+        for model in model_specs:
+            print(f"- {model['name']}")
+        return
+
+    bytes_per_parameter = get_bytes_per_parameter(precision)
+    adapter_params = calc_lora_params(model_spec, args.rank, target_modules, args.ffn_mult)
+    adapter_gb = adapter_params * bytes_per_parameter / 1e9
+    kv_cache_size_per_token = calc_kv_cache_size_per_token(
+        model_spec["n_layers"], model_spec["d_model"], bytes_per_parameter
+    )
+    memory_per_request = kv_cache_size_per_token * (prompt_size + response_size)
+    model_memory = model_spec["params_billion"] * bytes_per_parameter
+    swap_in_time = adapter_gb / args.host_bw_gbps
+
+    print(f"\n*** Multi-LoRA Serving Capacity for {model_spec['name']} ***")
+    print(f"num_gpu = {num_gpu}, prompt_size = {prompt_size} tokens, response_size = {response_size} tokens")
+    print(f"Precision: {precision}, maximum latency: {max_latency} seconds")
+    print(f"Adapters: {n_adapters} x rank {args.rank} on {','.join(target_modules)}, popularity zipf {args.zipf}")
+    print(f"\nAdapter parameters: {adapter_params / 1e6:.2f} M ({adapter_gb * 1000:.1f} MB per adapter)")
+    print(f"Adapter swap-in from host: {swap_in_time * 1000:.2f} ms")
+    print(f"Memory per request: {memory_per_request:.2f} GB, model parameters: {model_memory:.2f} GB")
+
+    # Adapter popularity, most popular first
+    popularity = 1.0 / np.arange(1, n_adapters + 1) ** args.zipf
+    popularity /= popularity.sum()
+
+    concurrent = np.arange(1, args.max_concurrent + 1)
+    if args.hot_set is not None:
+        hot_set = np.array([min(args.hot_set, n_adapters)])
+    else:
+        hot_set = np.arange(0, n_adapters + 1)
+
+    # Share of requests whose adapter is among the r most popular, per r
+    cumulative_popularity = np.concatenate([[0.0], np.cumsum(popularity)])
+    # Expected distinct adapters in a decode batch, per concurrency
+    distinct_adapters = (1 - (1 - popularity[None, :]) ** concurrent[:, None]).sum(axis=1)
+
+    results = []
+    for gpu in gpu_specs:
+        # Skip GPUs that don't support the specified precision
+        gpu_perf = get_compute_perf_for_precision(gpu, precision)
+        if gpu_perf is None:
+            continue
+
+        capacity = calc_lora_capacity(
+            model_spec, gpu, gpu_perf, num_gpu, prompt_size, response_size, max_latency,
+            adapter_params, adapter_gb, memory_per_request, model_memory, swap_in_time,
+            concurrent, hot_set, cumulative_popularity, distinct_adapters
+        )
+        if capacity is None:
+            results.append([gpu["name"], 0, "N/A", "N/A", "N/A", "N/A", "N/A", "N/A", "No", False])
+            continue
+
+        results.append([
+            gpu["name"],
+            capacity["max_concurrent"],
+            capacity["resident_adapters"],
+            f"{capacity['hit_rate']:.1%}",
+            capacity["max_resident_adapters"],
+            f"{capacity['tpot']:.3f} ms",
+            f"{capacity['e2e_latency']:.3f} s",
+            f"{capacity['throughput']:.2f} tokens/s",
+            "Yes",
+            capacity["at_search_limit"],
+        ])
+
+    # Sort results by concurrent requests served (descending)
+    results.sort(key=lambda x: x[1], reverse=True)
+
+    # Capacity at the search limit is only a lower bound
+    for row in results:
+        if row[9]:
+            row[1] = f">= {row[1]}"
+
+    print("\nMulti-LoRA Serving Capacity:")
+    print(tabulate([r[:9] for r in results], headers=[
+        'GPU Model',
+        'Max Concurrent',
+        'Resident Adapters',
+        'Adapter Hit Rate',
+        'Max Resident Adapters',
+        'TPOT',
+        'E2E Latency',
+        'Throughput',
+        'Meets Requirements',
+    ], tablefmt='orgtbl'))
+    if any(r[9] for r in results):
+        print(f"\n'>=' marks GPUs that still meet the requirements at --max_concurrent {args.max_concurrent}; "
+              f"raise it to search further.")
+
+def calc_lora_params(model_spec, rank, target_modules, ffn_mult):
+    """Calculate the parameter count of one LoRA adapter across all layers."""
+    d_model = model_spec["d_model"]
+    d_ffn = int(ffn_mult * d_model)
+    module_shapes = {
+        'q': (d_model, d_model),
+        'k': (d_model, d_model),
+        'v': (d_model, d_model),
+        'o': (d_model, d_model),
+        'gate': (d_model, d_ffn),
+        'up': (d_model, d_ffn),
+        'down': (d_ffn, d_model),
+    }
+    # Each module gets an A (d_in x r) and a B (r x d_out) matrix
+    per_layer = sum(rank * (module_shapes[m][0] + module_shapes[m][1]) for m in target_modules)
+    return model_spec["n_layers"] * per_layer
+
+def calc_lora_capacity(model_spec, gpu, gpu_perf, num_gpu, prompt_size, response_size, max_latency,
+                       adapter_params, adapter_gb, memory_per_request, model_memory, swap_in_time,
+                       concurrent, hot_set, cumulative_popularity, distinct_adapters):
+    """Find the largest concurrency and resident adapter set that meet memory and latency.
+
+    Every (concurrency, hot set) pair is evaluated at once. Batched LoRA kernels
+    read each distinct adapter in the decode batch once per step and add the
+    adapter FLOPs for every token; requests for non-resident adapters pay the
+    swap-in from host memory. The resident set is the hot set grown by the
+    adapters the batch uses, taken as the most popular adapters.
+    """
+    c = concurrent[:, None]
+    h = hot_set[None, :]
+
+    # Memory: model weights, KV cache for every request and resident adapters;
+    # the adapters used by the current batch are resident even outside the hot set
+    resident = np.maximum(h, np.ceil(distinct_adapters[:, None])).astype(int)
+    memory_required = model_memory + c * memory_per_request + resident * adapter_gb
+    fits = memory_required <= num_gpu * gpu["memory_gb"]
+
+    prefill_time = calc_prefill_time_per_token(num_gpu, model_spec["params_billion"] + adapter_params / 1e9, gpu_perf)
+    tpot = calc_tpot(num_gpu, model_spec["params_billion"], gpu["memory_bandwidth_gbps"])
+    lora_read = distinct_adapters[:, None] * adapter_gb / (num_gpu * gpu["memory_bandwidth_gbps"]) * 1000
+    lora_compute = c * calc_prefill_time_per_token(num_gpu, adapter_params / 1e9, gpu_perf)
+    tpot = tpot + lora_read + lora_compute
+
+    hit_rate = cumulative_popularity[resident]
+    expected_swap = (1 - hit_rate) * swap_in_time
+    e2e_latency = calc_e2e_latency(prefill_time, tpot, prompt_size, response_size) + expected_swap
+    feasible = fits & (e2e_latency <= max_latency)
+
+    if not feasible.any():
+        return None
+
+    # Largest concurrency first, then the largest resident set at that concurrency
+    rows = np.flatnonzero(feasible.any(axis=1))
+    i = rows[-1]
+    j = np.flatnonzero(feasible[i])[-1]
+    max_resident = resident[feasible].max()
+
+    return {
+        'max_concurrent': int(concurrent[i]),
+        'at_search_limit': i == len(concurrent) - 1,
+        'resident_adapters': int(resident[i, j]),
+        'hit_rate': hit_rate[i, j],
+        'max_resident_adapters': int(max_resident),
+        'tpot': tpot[i, 0],
+        'e2e_latency': e2e_latency[i, j],
+        'throughput': concurrent[i] * response_size / e2e_latency[i, j],
+    }
+
+if __name__ == '__main__':
+    main()
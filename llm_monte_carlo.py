@@ -0,0 +1,313 @@
+import argparse
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+    calc_prefill_activation_memory,
+    calc_max_batched_tokens,
+    calc_chunked_prefill_time,
+    MIN_PREFILL_CHUNK,
+)
+
+# Practical limit used by the GPU requirements calculator when adding GPUs for compute
+MAX_GPUS_FOR_COMPUTE = 128
+
+# Uncertain inputs, in the order they are reported in the sensitivity ranking
+SENSITIVITY_FACTORS = [
+    ('memory_bandwidth', 'Memory bandwidth efficiency'),
+    ('compute', 'Compute (TFLOPs) efficiency'),
+    ('opex_per_day', 'Opex per day'),
+    ('prompt_sz', 'Prompt size'),
+    ('response_sz', 'Response size'),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description='Monte Carlo Uncertainty and Sensitivity Analysis for LLM GPU Requirements')
+    parser.add_argument('-m', '--model', type=str, required=True, help='Model name')
+    parser.add_argument('-t', '--token_rate', type=float, required=True, help='Desired token rate (tokens/sec)')
+    parser.add_argument('-l', '--max_latency', type=float, required=True, help='Maximum acceptable E2E latency (seconds)')
+    parser.add_argument('-p', '--prompt_sz', type=int, default=4096, help='Median prompt size in tokens')
+    parser.add_argument('-r', '--response_sz', type=int, default=256, help='Median response size in tokens')
+    parser.add_argument('-w', '--precision', type=str, default='fp16',
+                        choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'],
+                        help='Precision level to use for calculations')
+    parser.add_argument('-c', '--max_concurrent', type=int, default=None,
+                        help='Maximum concurrent requests (calculated from token rate if not specified)')
+    parser.add_argument('-b', '--max_batched_tokens', type=int, default=None,
+                        help='Maximum tokens per prefill batch (largest that fits in memory if not specified)')
+    parser.add_argument('--attention', type=str, default='flash', choices=['flash', 'naive'],
+                        help='Attention implementation; naive attention materializes the attention scores')
+    parser.add_argument('--workspace_gb', type=float, default=1.0,
+                        help='Framework workspace memory per GPU (GB)')
+    parser.add_argument('-n', '--samples', type=int, default=20000, help='Number of Monte Carlo samples per GPU')
+    parser.add_argument('--efficiency', type=float, default=0.15,
+                        help='Largest shortfall of achievable memory bandwidth and TFLOPs below the datasheet peak')
+    parser.add_argument('--opex_spread', type=float, default=0.20,
+                        help='Relative uncertainty (+/-) of the GPU opex per day')
+    parser.add_argument('--prompt_sigma', type=float, default=0.5,
+                        help='Log-normal sigma of the prompt size distribution (0 for a fixed prompt size)')
+    parser.add_argument('--response_sigma', type=float, default=0.5,
+                        help='Log-normal sigma of the response size distribution (0 for a fixed response size)')
+    parser.add_argument('--confidence', type=float, default=90,
+                        help='Width of the reported confidence interval in percent')
+    parser.add_argument('--gpu', type=str, default=None,
+                        help='GPU to use for the sensitivity ranking (defaults to the recommended GPU)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible results')
+
+    args = parser.parse_args()
+
+    model_name = args.model
+    token_rate = args.token_rate
+    max_latency = args.max_latency
+    precision = args.precision
+    n_samples = args.samples
+
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    # Find the specified model in our database
+    model_spec = None
+    for model in model_specs:
+        if model["name"].lower() == model_name.lower():
+            model_spec = model
+            break
+
+    if model_spec is None:
+        print(f"Error: Model '{model_name}' not found in database.")
+        print("Available models:")
+        for model in model_specs:
+            print(f"- {model['name']}")
+        return
+
+    low_pct = (100 - args.confidence) / 2
+    high_pct = 100 - low_pct
+
+    print(f"\n*** Monte Carlo GPU Requirements for {model_spec['name']} ***")
+    print(f"Target token rate: {token_rate} tokens/sec")
+    print(f"Maximum latency: {max_latency} seconds")
+    print(f"Median prompt size: {args.prompt_sz} tokens (sigma {args.prompt_sigma}), "
+          f"median response size: {args.response_sz} tokens (sigma {args.response_sigma})")
+    print(f"Precision: {precision}")
+    print(f"Efficiency: -{args.efficiency:.0%} to peak, opex: +/-{args.opex_spread:.0%}, samples: {n_samples}")
+    print(f"Prefill workspace per GPU: {args.workspace_gb:.2f} GB, attention: {args.attention}")
+    print(f"Reporting p{low_pct:g} / p50 / p{high_pct:g}")
+
+    rng = np.random.default_rng(args.seed)
+    # Prefill activation and workspace sizing, as in the GPU requirements calculator
+    sizing = {
+        'max_batched_tokens': args.max_batched_tokens,
+        'attention': args.attention,
+        'workspace_gb': args.workspace_gb,
+    }
+
+    results = []
+    samples_by_gpu = {}
+
+    for gpu in gpu_specs:
+        # Skip GPUs that don't support the specified precision
+        gpu_perf = get_compute_perf_for_precision(gpu, precision)
+        if gpu_perf is None:
+            continue
+
+        # Draw the uncertain inputs for this GPU
+        inputs = sample_inputs(rng, n_samples, gpu, args)
+        outcome = evaluate_gpu_requirements(
+            model_spec, gpu, token_rate, max_latency, precision, args.max_concurrent, **inputs, **sizing
+        )
+        samples_by_gpu[gpu["name"]] = (gpu, inputs)
+
+        gpus_needed = np.percentile(outcome["gpus_needed"], [low_pct, 50, high_pct])
+        # Samples with no room for a prefill chunk never finish, so take actual
+        # samples instead of interpolating towards infinity
+        e2e_latency = np.percentile(outcome["e2e_latency"], [low_pct, 50, high_pct], method='nearest')
+        monthly_opex = np.percentile(outcome["monthly_opex"], [low_pct, 50, high_pct])
+        p_meets = outcome["meets_requirements"].mean()
+
+        results.append([
+            gpu["name"],
+            " / ".join(f"{v:.0f}" for v in gpus_needed),
+            " / ".join(f"{v:.2f}" if np.isfinite(v) else "N/A" for v in e2e_latency) + " s",
+            " / ".join(f"${v:,.0f}" for v in monthly_opex),
+            f"{p_meets:.1%}",
+            monthly_opex[1],
+            p_meets,
+        ])
+
+    # Sort results by median monthly opex (ascending)
+    results.sort(key=lambda x: x[5])
+
+    print("\nGPU Requirements Uncertainty:")
+    print(tabulate([r[:5] for r in results], headers=[
+        'GPU Model',
+        'GPUs Needed',
+        'E2E Latency',
+        'Monthly Opex',
+        'P(Meets Requirements)'
+    ], tablefmt='orgtbl'))
+
+    # Pick the GPU for the sensitivity ranking
+    if args.gpu is not None:
+        selected = [name for name in samples_by_gpu if name.lower() == args.gpu.lower()]
+        if not selected:
+            print(f"\nError: GPU '{args.gpu}' not found in database or does not support {precision}.")
+            return
+        gpu_name = selected[0]
+    else:
+        # Prefer the cheapest GPU that meets the requirements in most samples
+        likely = [r for r in results if r[6] >= 0.5]
+        if not likely:
+            print("\nNo GPU meets the requirements in the majority of samples; skipping sensitivity ranking.")
+            return
+        gpu_name = likely[0][0]
+
+    gpu, inputs = samples_by_gpu[gpu_name]
+    ranking = calc_sensitivity(
+        model_spec, gpu, token_rate, max_latency, precision, args.max_concurrent, inputs, low_pct, high_pct, **sizing
+    )
+
+    print(f"\nSensitivity of Monthly Opex for {gpu_name} (tornado ranking):")
+    print(tabulate([[
+        label,
+        f"{low_value:,.4g} / {high_value:,.4g}",
+        f"${opex_low:,.0f}",
+        f"${opex_high:,.0f}",
+        f"${swing:,.0f}",
+        " / ".join(f"{v:.2f} s" if np.isfinite(v) else "N/A" for v in (e2e_low, e2e_high)),
+    ] for label, low_value, high_value, opex_low, opex_high, swing, e2e_low, e2e_high in ranking], headers=[
+        'Input',
+        f'p{low_pct:g} / p{high_pct:g} Value',
+        f'Opex @ p{low_pct:g}',
+        f'Opex @ p{high_pct:g}',
+        'Opex Swing',
+        'E2E Latency Range',
+    ], tablefmt='orgtbl'))
+
+def sample_inputs(rng, n_samples, gpu, args):
+    """Draw samples of the uncertain spec and workload inputs for one GPU."""
+    def uniform_spread(nominal, spread):
+        return nominal * rng.uniform(1 - spread, 1 + spread, n_samples)
+
+    def lognormal_size(median, sigma):
+        return np.maximum(1, np.round(median * rng.lognormal(0.0, sigma, n_samples)))
+
+    return {
+        # Datasheet bandwidth and TFLOPs are peaks, so efficiency never exceeds 1
+        'memory_bandwidth': rng.uniform(1 - args.efficiency, 1, n_samples),
+        'compute': rng.uniform(1 - args.efficiency, 1, n_samples),
+        'opex_per_day': uniform_spread(gpu["opex_per_day"], args.opex_spread),
+        'prompt_sz': lognormal_size(args.prompt_sz, args.prompt_sigma),
+        'response_sz': lognormal_size(args.response_sz, args.response_sigma),
+    }
+
+def evaluate_gpu_requirements(model_spec, gpu, token_rate, max_latency, precision, max_concurrent,
+                              memory_bandwidth, compute, opex_per_day, prompt_sz, response_sz,
+                              max_batched_tokens=None, attention='flash', workspace_gb=1.0):
+    """Vectorized version of the GPU requirements sizing in llm_gpu_calculator.
+
+    `memory_bandwidth` and `compute` are efficiency multipliers applied to the
+    GPU spec values; every input may be a scalar or an array of samples.
+    """
+    params_billion = model_spec["params_billion"]
+    bytes_per_parameter = get_bytes_per_parameter(precision)
+    kv_cache_size_per_token = calc_kv_cache_size_per_token(
+        model_spec["n_layers"], model_spec["d_model"], bytes_per_parameter
+    )
+    effective_perf = get_compute_perf_for_precision(gpu, precision) * compute
+    effective_bandwidth = gpu["memory_bandwidth_gbps"] * memory_bandwidth
+
+    # Concurrency needed to reach the token rate if not specified
+    if max_concurrent is None:
+        concurrent = np.ceil(token_rate * max_latency / response_sz)
+    else:
+        concurrent = max_concurrent
+
+    # Minimum GPUs so that prefill alone fits in the latency budget
+    min_gpus_for_compute = np.ceil(2 * params_billion * prompt_sz / (effective_perf * max_latency * 1000))
+    min_gpus_for_compute = np.clip(min_gpus_for_compute, 1, MAX_GPUS_FOR_COMPUTE + 1)
+
+    # GPUs needed to hold the model parameters, the KV cache, the workspace and
+    # the activations of one prefill chunk on every GPU
+    total_memory_required = (kv_cache_size_per_token * (prompt_sz + response_sz) * concurrent
+                             + params_billion * bytes_per_parameter)
+    required_chunk = max_batched_tokens if max_batched_tokens is not None else np.minimum(prompt_sz, MIN_PREFILL_CHUNK)
+    gpus_for_memory = np.ceil(total_memory_required / gpu["memory_gb"])
+    while True:
+        free_memory = gpu["memory_gb"] - total_memory_required / gpus_for_memory - workspace_gb
+        activation_memory = calc_prefill_activation_memory(
+            required_chunk, model_spec["d_model"], model_spec["n_heads"], gpus_for_memory,
+            bytes_per_parameter, attention, seq_len=prompt_sz
+        )
+        grow = (activation_memory > free_memory) & (gpus_for_memory <= MAX_GPUS_FOR_COMPUTE)
+        if not np.any(grow):
+            break
+        gpus_for_memory = gpus_for_memory + grow
+    chunk_fits = gpus_for_memory <= MAX_GPUS_FOR_COMPUTE
+    gpus_needed = np.maximum(min_gpus_for_compute, gpus_for_memory)
+
+    # Latency and throughput with the actual number of GPUs, prefilling in chunks
+    # of the largest batch that fits next to the weights and KV cache
+    prefill_time = calc_prefill_time_per_token(gpus_needed, params_billion, effective_perf)
+    tpot = calc_tpot(gpus_needed, params_billion, effective_bandwidth)
+    free_memory = gpu["memory_gb"] - total_memory_required / gpus_needed - workspace_gb
+    batched_tokens = calc_max_batched_tokens(
+        free_memory, model_spec["d_model"], model_spec["n_heads"], gpus_needed, bytes_per_parameter, attention,
+        limit=max_batched_tokens if max_batched_tokens is not None else prompt_sz * concurrent,
+        seq_len=prompt_sz
+    )
+    prefill_total = calc_chunked_prefill_time(prompt_sz, np.asarray(batched_tokens), prefill_time, tpot)
+    e2e_latency = (prefill_total + response_sz * tpot) / 1000
+    throughput = response_sz / e2e_latency * concurrent
+
+    return {
+        'gpus_needed': gpus_needed,
+        'e2e_latency': e2e_latency,
+        'throughput': throughput,
+        'monthly_opex': gpus_needed * opex_per_day * 30,
+        'meets_requirements': ((e2e_latency <= max_latency) & (throughput >= token_rate) &
+                               chunk_fits & (batched_tokens >= required_chunk)),
+    }
+
+def calc_sensitivity(model_spec, gpu, token_rate, max_latency, precision, max_concurrent, inputs, low_pct, high_pct,
+                     **sizing):
+    """Rank the uncertain inputs by the monthly opex swing they cause on their own.
+
+    Each input is moved to its low and high percentile while all other inputs
+    are held at their median; all scenarios are evaluated in one vectorized call.
+    """
+    medians = {key: np.median(values) for key, values in inputs.items()}
+    n_factors = len(SENSITIVITY_FACTORS)
+
+    # Row 2*i is factor i at its low percentile, row 2*i+1 at its high percentile
+    scenarios = {key: np.full(2 * n_factors, value) for key, value in medians.items()}
+    bounds = []
+    for i, (key, _) in enumerate(SENSITIVITY_FACTORS):
+        low_value, high_value = np.percentile(inputs[key], [low_pct, high_pct])
+        scenarios[key][2 * i] = low_value
+        scenarios[key][2 * i + 1] = high_value
+        bounds.append((low_value, high_value))
+
+    outcome = evaluate_gpu_requirements(
+        model_spec, gpu, token_rate, max_latency, precision, max_concurrent, **scenarios, **sizing
+    )
+    opex = outcome["monthly_opex"].reshape(n_factors, 2)
+    e2e_latency = outcome["e2e_latency"].reshape(n_factors, 2)
+
+    ranking = []
+    for i, (_, label) in enumerate(SENSITIVITY_FACTORS):
+        swing = abs(opex[i, 1] - opex[i, 0])
+        ranking.append((label, bounds[i][0], bounds[i][1], opex[i, 0], opex[i, 1], swing,
+                        e2e_latency[i].min(), e2e_latency[i].max()))
+
+    # Largest swing first, as in a tornado chart
+    ranking.sort(key=lambda x: x[5], reverse=True)
+    return ranking
+
+if __name__ == '__main__':
+    main()
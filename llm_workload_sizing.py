@@ -0,0 +1,173 @@
+import argparse
+import csv
+from tabulate import tabulate
+import numpy as np
+
+from llm_gpu_calculator import (
+    load_gpu_specs,
+    load_model_specs,
+    get_bytes_per_parameter,
+    calc_kv_cache_size_per_token,
+    get_compute_perf_for_precision,
+    calc_prefill_time_per_token,
+    calc_tpot,
+    calc_e2e_latency,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description='Request-Length Distribution-Aware Sizing for LLMs')
+    parser.add_argument('-f', '--workload', type=str, required=True,
+                        help='CSV/TSV file with prompt_sz and response_sz columns and an optional count column')
+    parser.add_argument('-g', '--num_gpu', type=int, default=1, help='Number of GPUs')
+    parser.add_argument('-c', '--n_concurrent_req', type=int, default=10, help='Number of concurrent requests')
+    parser.add_argument('--occupancy_pct', type=float, default=95,
+                        help='Percentile of KV cache occupancy the memory is sized for')
+    parser.add_argument('--precision', type=str, default='fp16', choices=['int8', 'fp8', 'fp16', 'bf16', 'tf32', 'fp32', 'fp64'],
+                        help='Precision level to use for calculations')
+    parser.add_argument('-m', '--model', type=str, default=None, help='Only report this model')
+    parser.add_argument('--trials', type=int, default=10000, help='Number of sampled concurrent batches for the occupancy estimate')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible results')
+
+    args = parser.parse_args()
+
+    num_gpu = args.num_gpu
+    n_concurrent_request = args.n_concurrent_req
+    occupancy_pct = args.occupancy_pct
+    precision = args.precision
+
+    gpu_specs = load_gpu_specs()
+    model_specs = load_model_specs()
+
+    if args.model is not None:
+        model_specs = [model for model in model_specs if model["name"].lower() == args.model.lower()]
+        if not model_specs:
+            print(f"Error: Model '{args.model}' not found in database.")
+            return
+
+    try:
+        prompt_sz, response_sz, weights = load_workload(args.workload)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    context_window = prompt_sz + response_sz
+
+    print(f" num_gpu = {num_gpu}, n_concurrent_request = {n_concurrent_request}, precision = {precision}")
+    print(f" workload = {args.workload}: {len(prompt_sz)} request shapes, sized at p{occupancy_pct:g} KV cache occupancy")
+
+    print(f"\n******************** Workload Distribution ********************")
+    pcts = [50, 95, 99]
+    workload_table = []
+    for label, values in [('Prompt', prompt_sz), ('Response', response_sz), ('Context', context_window)]:
+        row = [label, f"{np.average(values, weights=weights):.0f}"]
+        row += [f"{v:.0f}" for v in weighted_percentile(values, weights, pcts)]
+        workload_table.append(row)
+    print(tabulate(workload_table, headers=['Tokens', 'Mean', 'p50', 'p95', 'p99'], tablefmt='orgtbl'))
+
+    bytes_per_parameter = get_bytes_per_parameter(precision)
+    rng = np.random.default_rng(args.seed)
+    # Shared uniforms so every configuration sees the same sampled batches
+    uniforms = rng.random((args.trials, n_concurrent_request))
+
+    # Filter out GPUs that don't support the specified precision
+    supported_gpus = [gpu for gpu in gpu_specs if get_compute_perf_for_precision(gpu, precision) is not None]
+
+    print(f"\n******************** Estimate LLM Performance over the Workload with {precision.upper()} Precision ********************")
+    capacity_latency_table = []
+    for model in model_specs:
+        kv_cache_size = calc_kv_cache_size_per_token(model['n_layers'], model['d_model'], bytes_per_parameter)
+        model_size_gb = model['params_billion'] * bytes_per_parameter
+
+        # Requests longer than the context window cannot be served by this model
+        in_context = context_window <= model['max_context_window']
+        over_context = weights[~in_context].sum() / weights.sum()
+        if over_context > 0:
+            print(f"!!!! Warning {model['name']}: {over_context:.1%} of requests exceed the {model['max_context_window']} token context window and are left out")
+        if weights[in_context].sum() <= 0:
+            print(f"!!!! Warning {model['name']}: no requests fit the context window, skipping")
+            continue
+        model_prompt_sz = prompt_sz[in_context]
+        model_response_sz = response_sz[in_context]
+        model_context_window = context_window[in_context]
+        model_weights = weights[in_context]
+
+        for gpu in supported_gpus:
+            gpu_perf = get_compute_perf_for_precision(gpu, precision)
+
+            # Per-request latency over every request shape at once
+            prefill_time_per_token = calc_prefill_time_per_token(num_gpu, model['params_billion'], gpu_perf)
+            tpot = calc_tpot(num_gpu, model['params_billion'], gpu['memory_bandwidth_gbps'])
+            ttft = (model_prompt_sz * prefill_time_per_token + tpot) / 1000
+            e2e_latency = calc_e2e_latency(prefill_time_per_token, tpot, model_prompt_sz, model_response_sz)
+
+            kv_tokens_needed = calc_occupancy_tokens(model_context_window, model_weights, e2e_latency, uniforms, occupancy_pct)
+            memory_needed = kv_cache_size * kv_tokens_needed + model_size_gb
+            available_memory = num_gpu * gpu['memory_gb']
+            max_kv_cache_tokens = max((available_memory - model_size_gb) / kv_cache_size, 0)
+
+            e2e_pcts = weighted_percentile(e2e_latency, model_weights, [95, 99])
+            ttft_pcts = weighted_percentile(ttft, model_weights, [95, 99])
+
+            capacity_latency_table.append([
+                model['name'], gpu['name'],
+                f"{memory_needed:.2f} GB",
+                "Fits" if memory_needed <= available_memory else "OOM",
+                f"{int(max_kv_cache_tokens)}",
+                f"{np.average(e2e_latency, weights=model_weights):.2f} s",
+                f"{e2e_pcts[0]:.2f} s",
+                f"{e2e_pcts[1]:.2f} s",
+                f"{ttft_pcts[0]:.3f} s",
+                f"{ttft_pcts[1]:.3f} s",
+            ])
+
+    print(tabulate(capacity_latency_table,
+                   headers=['Model', 'GPU', f'Memory @ p{occupancy_pct:g}', 'Memory Status', 'Max KV Cache Tokens',
+                            'Mean E2E', 'p95 E2E', 'p99 E2E', 'p95 TTFT', 'p99 TTFT'],
+                   tablefmt='orgtbl'))
+
+def load_workload(path):
+    """Load (prompt, response) lengths as arrays plus a weight per row."""
+    delimiter = '\t' if path.endswith('.tsv') else ','
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f, delimiter=delimiter))
+
+    if not rows:
+        raise ValueError(f"Workload file '{path}' has no rows")
+
+    prompt_sz = np.array([float(row['prompt_sz']) for row in rows])
+    response_sz = np.array([float(row['response_sz']) for row in rows])
+    # A count column turns the file into a histogram; otherwise every row is one sample
+    if 'count' in rows[0]:
+        weights = np.array([float(row['count']) for row in rows])
+    else:
+        weights = np.ones(len(rows))
+
+    if np.any(weights < 0):
+        raise ValueError(f"Workload file '{path}' has negative counts")
+    if weights.sum() <= 0:
+        raise ValueError(f"Workload file '{path}' has no requests (all counts are zero)")
+    return prompt_sz, response_sz, weights
+
+def weighted_percentile(values, weights, percentiles):
+    """Calculate percentiles of a weighted sample."""
+    order = np.argsort(values)
+    sorted_values = np.asarray(values)[order]
+    cumulative = np.cumsum(np.asarray(weights)[order])
+    targets = np.asarray(percentiles) / 100 * cumulative[-1]
+    idx = np.searchsorted(cumulative, targets, side='left')
+    return sorted_values[np.minimum(idx, len(sorted_values) - 1)]
+
+def calc_occupancy_tokens(context_window, weights, e2e_latency, uniforms, occupancy_pct):
+    """Calculate KV cache tokens held by the concurrent requests at a percentile of occupancy.
+
+    A request occupies a slot for its whole E2E latency, so the request found
+    in a slot at a random moment is length-biased: it is drawn with probability
+    proportional to its weight times its latency.
+    """
+    occupancy_weights = weights * e2e_latency
+    cdf = np.cumsum(occupancy_weights) / occupancy_weights.sum()
+    idx = np.minimum(np.searchsorted(cdf, uniforms, side='right'), len(cdf) - 1)
+    batch_tokens = context_window[idx].sum(axis=1)
+    return np.percentile(batch_tokens, occupancy_pct)
+
+if __name__ == '__main__':
+    main()